@@ -12,6 +12,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,6 +57,7 @@ AUTH_USER_MODEL = 'DBComm.User'
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Should be at the top
     'django.middleware.security.SecurityMiddleware',
+    'DBComm.middleware.CompressionMiddleware',  # Before anything that reads or changes the body
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -156,9 +158,8 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',  # For development
-    ],
+        'DBComm.renderers.FastJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),  # For development
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.MultiPartParser',
@@ -285,4 +286,28 @@ CACHES = {
 #         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
 #         'LOCATION': 'redis://127.0.0.1:6379/1',
 #     }
-# }
\ No newline at end of file
+# }
+
+# Write-behind Buffers (see DBComm/buffers.py)
+# Under `manage.py test` buffered writes happen at once, inside the test's transaction
+WRITE_BEHIND_SYNCHRONOUS = sys.argv[1:2] == ['test']
+
+# Search Logging (write-behind; see DBComm/buffers.py)
+SEARCH_LOG_FLUSH_INTERVAL = 5  # seconds between batch inserts
+SEARCH_LOG_BATCH_SIZE = 500  # flush early once this many searches are queued
+SEARCH_LOG_DEDUP_WINDOW = 300  # seconds an identical search by the same user is logged once
+
+
+# Saved-search Alerts (see DBComm/alerts.py)
+ALERT_FLUSH_INTERVAL = 5  # seconds between matching batches of new listings
+ALERT_SEARCH_MAX_AGE_DAYS = 30  # searches older than this no longer trigger alerts
+ALERT_INDEX_REBUILD_INTERVAL = 3600  # seconds between full rebuilds of the in-memory index
+
+
+# Listing Counters (write-behind; see DBComm/buffers.py)
+VIEW_COUNT_FLUSH_INTERVAL = 10  # seconds between batched UPDATEs of listing view counts
+VIEW_COUNT_DEDUP_WINDOW = 1800  # seconds a visitor's repeat views of a property are ignored; 0 counts every view
+
+# Response Compression (see DBComm/middleware.py)
+COMPRESSION_MIN_LENGTH = 1024  # bytes; shorter responses are sent uncompressed
+BROTLI_QUALITY = 5  # 0-11; used when the client accepts br and brotli is installed
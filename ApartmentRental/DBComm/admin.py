@@ -7,7 +7,7 @@ from .models import (
     User, Address, Property, PropertyType, FurnishingType,
     Amenity, PropertyAmenity, Listing, PropertyImage,
     PropertyInquiry, SavedProperty, UserSearch, ReviewRating,
-    PropertyVisit, NearbyPlace, UserPreference
+    PropertyVisit, NearbyPlace, UserPreference, PropertySearchDocument, NotificationOutbox
 )
 
 
@@ -210,4 +210,20 @@ class NearbyPlaceAdmin(admin.ModelAdmin):
 @admin.register(UserPreference)
 class UserPreferenceAdmin(admin.ModelAdmin):
     list_display = ('user', 'budget_min', 'budget_max', 'email_notifications', 'sms_notifications')
-    search_fields = ('user__username',)
\ No newline at end of file
+    search_fields = ('user__username',)
+
+
+@admin.register(PropertySearchDocument)
+class PropertySearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ('title', 'city', 'locality', 'bedrooms', 'monthly_rent', 'indexed_at')
+    list_filter = ('city', 'bedrooms', 'property_type')
+    search_fields = ('title', 'city', 'locality')
+    readonly_fields = [field.name for field in PropertySearchDocument._meta.fields]
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('user', 'channel', 'listing', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('channel', 'status', 'created_at')
+    search_fields = ('user__username', 'listing__property__title')
+    raw_id_fields = ('user', 'listing', 'user_search')
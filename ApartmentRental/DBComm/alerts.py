@@ -0,0 +1,333 @@
+# alerts.py - Match newly listed properties against users' saved searches
+
+import bisect
+import threading
+import time
+from array import array
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from .models import Locality, NotificationOutbox, Property, PropertySearchDocument, UserPreference, UserSearch
+from .buffers import WriteBehindBuffer
+from .caching import get_versions, LOCALITY_SET
+
+# Stands in for a criterion a saved search leaves open
+ANY = '*'
+
+# Upper edges (INR per month) of the rent bands saved searches are bucketed by
+RENT_BAND_EDGES = [5000, 10000, 15000, 20000, 25000, 30000, 40000, 50000, 75000, 100000, 150000, 250000]
+
+ALERT_INDEX_CHUNK_SIZE = 10000
+NOTIFICATION_BATCH_SIZE = 1000
+
+SavedSearch = namedtuple('SavedSearch', [
+    'id', 'user_id', 'location', 'min_rent', 'max_rent', 'bedrooms',
+    'property_type_id', 'furnishing_id', 'extra', 'created_at',
+])
+
+# Criteria only stored in UserSearch.search_query; None on a SavedSearch when all are empty
+ExtraCriteria = namedtuple('ExtraCriteria', [
+    'bathrooms', 'min_area', 'max_area', 'amenities', 'preferred_tenant', 'parking_required', 'available_from',
+])
+
+
+def rent_band(rent):
+    return bisect.bisect_right(RENT_BAND_EDGES, rent)
+
+
+def _integer(value):
+    try:
+        return int(value) or None
+    except (TypeError, ValueError):
+        return None
+
+
+def _extra_criteria(search_query):
+    if not isinstance(search_query, dict):
+        return None
+
+    try:
+        amenities = frozenset(int(pk) for pk in search_query.get('amenities') or [])
+    except (TypeError, ValueError):
+        amenities = frozenset()
+    try:
+        available_from = date.fromisoformat(str(search_query['available_from']))
+    except (KeyError, TypeError, ValueError):
+        available_from = None
+
+    extra = ExtraCriteria(
+        bathrooms=_integer(search_query.get('bathrooms')),
+        min_area=_integer(search_query.get('min_area')),
+        max_area=_integer(search_query.get('max_area')),
+        amenities=amenities,
+        preferred_tenant=search_query.get('preferred_tenant') or None,
+        parking_required=bool(search_query.get('parking_required')),
+        available_from=available_from,
+    )
+    return extra if any(extra) else None
+
+
+def saved_search_from_row(row):
+    search_id, user_id, location, min_rent, max_rent, bedrooms, property_type_id, furnishing_id, query, created_at = row
+    return SavedSearch(
+        id=search_id,
+        user_id=user_id,
+        location=(location or '').strip().lower() or None,
+        min_rent=float(min_rent) if min_rent else None,
+        max_rent=float(max_rent) if max_rent else None,
+        bedrooms=bedrooms or None,
+        property_type_id=property_type_id,
+        furnishing_id=furnishing_id,
+        extra=_extra_criteria(query),
+        created_at=created_at,
+    )
+
+
+def search_matches(search, document):
+    """Whether search_documents() would return this document for the saved search"""
+    rent = float(document.monthly_rent)
+    if search.min_rent is not None and rent < search.min_rent:
+        return False
+    if search.max_rent is not None and rent > search.max_rent:
+        return False
+    if search.bedrooms and document.bedrooms != search.bedrooms:
+        return False
+    if search.property_type_id and document.property_type_id != search.property_type_id:
+        return False
+    if search.furnishing_id and document.furnishing_id != search.furnishing_id:
+        return False
+    if search.location and not any(
+        search.location in value.lower() for value in (document.locality, document.city, document.state)
+    ):
+        return False
+
+    extra = search.extra
+    if extra is None:
+        return True
+    if extra.bathrooms and document.bathrooms < extra.bathrooms:
+        return False
+    if extra.min_area and (document.total_area_sqft is None or document.total_area_sqft < extra.min_area):
+        return False
+    if extra.max_area and (document.total_area_sqft is None or document.total_area_sqft > extra.max_area):
+        return False
+    if extra.amenities and not extra.amenities.issubset(document.amenity_ids):
+        return False
+    if extra.preferred_tenant and document.preferred_tenant not in (extra.preferred_tenant, 'any'):
+        return False
+    if extra.parking_required and not document.parking_available:
+        return False
+    if extra.available_from and (document.available_from is None or document.available_from > extra.available_from):
+        return False
+    return True
+
+
+class LocalityCities:
+    """Cities whose localities a free-text location can match (substring of name, city or state)"""
+
+    def __init__(self, localities):
+        lines, self.cities, self.starts = [], [], []
+        offset = 0
+        for locality_name, city, state in localities:
+            line = f'{locality_name}\t{city}\t{state}'.lower()
+            lines.append(line)
+            self.cities.append(city.strip().lower())
+            self.starts.append(offset)
+            offset += len(line) + 1
+        # One string scanned with str.find instead of a Python loop per locality
+        self.text = '\n'.join(lines)
+        self._cache = {}
+
+    def __call__(self, location):
+        cities = self._cache.get(location)
+        if cities is None:
+            found = set()
+            position = self.text.find(location)
+            while position != -1:
+                line = bisect.bisect_right(self.starts, position) - 1
+                found.add(self.cities[line])
+                next_line = self.starts[line + 1] if line + 1 < len(self.starts) else len(self.text)
+                position = self.text.find(location, next_line)
+            cities = self._cache[location] = frozenset(found)
+        return cities
+
+
+class SavedSearchIndex:
+    """
+    Inverted index over recent saved searches keyed by (city, bedrooms, rent band), with ANY
+    for criteria a search leaves open. A new listing looks up at most eight buckets and only
+    checks the searches in them. Repeats of the same search by a user are indexed once.
+    """
+
+    def __init__(self, max_age_days, rebuild_interval):
+        self.max_age = timedelta(days=max_age_days)
+        self.rebuild_interval = rebuild_interval
+        self.built_at = None
+
+    def refresh(self):
+        """Rebuild when stale or when localities changed, otherwise pick up newly logged searches"""
+        if (
+            self.built_at is None or
+            time.monotonic() - self.built_at > self.rebuild_interval or
+            get_versions([LOCALITY_SET])[LOCALITY_SET] != self.locality_version
+        ):
+            self.rebuild()
+        else:
+            # Searches committed out of id order are picked up by the next rebuild
+            self.load(UserSearch.objects.filter(pk__gt=self.last_search_id))
+
+    def rebuild(self):
+        self.records = {}  # search id -> SavedSearch; superseded repeats are removed
+        self.buckets = defaultdict(lambda: array('q'))  # (city, bedrooms, rent band) -> search ids
+        self.latest = {}  # (user, criteria) -> newest search id
+        self.last_search_id = 0
+        self.locality_version = get_versions([LOCALITY_SET])[LOCALITY_SET]
+        self.cities_for = LocalityCities(
+            Locality.objects.values_list('locality_name', 'city', 'state').iterator(chunk_size=ALERT_INDEX_CHUNK_SIZE)
+        )
+        self.built_at = time.monotonic()
+        self.load(UserSearch.objects.filter(created_at__gte=timezone.now() - self.max_age))
+
+    def load(self, searches):
+        rows = searches.order_by('pk').values_list(
+            'pk', 'user_id', 'location', 'min_rent', 'max_rent', 'bedrooms',
+            'property_type_id', 'furnishing_id', 'search_query', 'created_at'
+        )
+        for row in rows.iterator(chunk_size=ALERT_INDEX_CHUNK_SIZE):
+            self.add(saved_search_from_row(row))
+            self.last_search_id = max(self.last_search_id, row[0])
+
+    def add(self, search):
+        # The criteria tuple itself, not its hash: distinct searches may share a hash
+        signature = search[1:-1]
+        previous = self.latest.get(signature)
+        if previous is not None:
+            self.records.pop(previous, None)
+        self.latest[signature] = search.id
+
+        if search.location:
+            cities = self.cities_for(search.location)
+            if not cities:
+                return  # matches no locality yet; a new locality triggers a rebuild
+        else:
+            cities = (ANY,)
+
+        if search.min_rent is None and search.max_rent is None:
+            bands = (ANY,)
+        else:
+            low = rent_band(search.min_rent) if search.min_rent is not None else 0
+            high = rent_band(search.max_rent) if search.max_rent is not None else len(RENT_BAND_EDGES)
+            bands = range(low, high + 1)
+
+        self.records[search.id] = search
+        bedrooms = search.bedrooms or ANY
+        for city in cities:
+            for band in bands:
+                self.buckets[(city, bedrooms, band)].append(search.id)
+
+    def match(self, document):
+        """Saved searches, still within max age, that the document satisfies"""
+        cutoff = timezone.now() - self.max_age
+        band = rent_band(float(document.monthly_rent))
+        for city in (document.city.strip().lower(), ANY):
+            for bedrooms in (document.bedrooms, ANY):
+                for rent in (band, ANY):
+                    for search_id in self.buckets.get((city, bedrooms, rent), ()):
+                        search = self.records.get(search_id)
+                        if search is not None and search.created_at >= cutoff and search_matches(search, document):
+                            yield search
+
+
+def enabled_channels(preferences):
+    """Channels a user accepts notifications on; users without preferences get the model defaults"""
+    return [
+        channel for channel, _ in NotificationOutbox.CHANNEL_CHOICES
+        if getattr(preferences, f'{channel}_notifications', True)
+    ]
+
+
+def create_notifications(matches):
+    """Write one outbox row per matched user, listing and enabled channel"""
+    first_match = {}
+    for search, document in matches:
+        first_match.setdefault((search.user_id, document.listing_id), (search, document))
+
+    user_ids = {user_id for user_id, _ in first_match}
+    preferences = {
+        preference.user_id: preference
+        for preference in UserPreference.objects.filter(user_id__in=user_ids).only(
+            'user_id', 'email_notifications', 'sms_notifications', 'push_notifications'
+        )
+    }
+
+    notifications = []
+    for (user_id, listing_id), (search, document) in first_match.items():
+        payload = {
+            'property_id': document.pk,
+            'title': document.title,
+            'locality': document.locality,
+            'city': document.city,
+            'bedrooms': document.bedrooms,
+            'monthly_rent': str(document.monthly_rent),
+        }
+        notifications.extend(
+            NotificationOutbox(
+                user_id=user_id,
+                channel=channel,
+                listing_id=listing_id,
+                user_search_id=search.id,
+                payload=payload
+            )
+            for channel in enabled_channels(preferences.get(user_id))
+        )
+
+    NotificationOutbox.objects.bulk_create(notifications, batch_size=NOTIFICATION_BATCH_SIZE, ignore_conflicts=True)
+
+
+class ListingAlertBuffer(WriteBehindBuffer):
+    """Newly listed search documents, matched against saved searches from the background thread"""
+    name = 'listing-alerts'
+
+    def __init__(self):
+        super().__init__()
+        self.flush_interval = getattr(settings, 'ALERT_FLUSH_INTERVAL', 5)
+        self.index = SavedSearchIndex(
+            max_age_days=getattr(settings, 'ALERT_SEARCH_MAX_AGE_DAYS', 30),
+            rebuild_interval=getattr(settings, 'ALERT_INDEX_REBUILD_INTERVAL', 3600)
+        )
+        self._pending = {}  # property id -> listing id
+        self._index_lock = threading.Lock()
+
+    def enqueue(self, documents):
+        with self.lock:
+            for document in documents:
+                self._pending[document.pk] = document.listing_id
+            pending_count = len(self._pending)
+        self.notify(pending_count)
+
+    def drain(self):
+        items, self._pending = self._pending, {}
+        return items
+
+    def write(self, items):
+        with self._index_lock:
+            self.index.refresh()
+
+            owners = dict(Property.objects.filter(pk__in=list(items)).values_list('pk', 'owner_id'))
+            documents = PropertySearchDocument.objects.filter(pk__in=list(items)).defer('search_vector')
+
+            matches = []
+            for document in documents:
+                if items[document.pk] != document.listing_id:
+                    continue  # listing replaced again since; the newer one is queued separately
+                matches.extend(
+                    (search, document) for search in self.index.match(document)
+                    if search.user_id != owners.get(document.pk)
+                )
+
+        if matches:
+            create_notifications(matches)
+
+
+listing_alerts = ListingAlertBuffer()
@@ -0,0 +1,248 @@
+# buffers.py - In-process write-behind buffers flushed from a background thread
+
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction, DatabaseError, DataError, IntegrityError, OperationalError
+from django.db.models import F
+from .models import Listing, PropertySearchDocument, UserSearch
+from .caching import search_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Collects writes in memory and applies them in batches from a daemon thread,
+    so request threads never wait on the database for them. Subclasses hold their
+    pending items under `self.lock` and implement drain() and write().
+
+    With WRITE_BEHIND_SYNCHRONOUS on (the test suite), items are written at once in
+    the caller's thread and transaction, and no worker or exit flush ever runs: those
+    would reach the real database once the test database is gone.
+    """
+    name = 'write-behind'
+    flush_interval = 5  # seconds
+    max_pending = 500  # flush early once this many items are queued
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        atexit.register(self._flush_at_exit)
+
+    def notify(self, pending_count):
+        """Call after queueing an item; starts the worker and wakes it when the batch is full"""
+        if getattr(settings, 'WRITE_BEHIND_SYNCHRONOUS', False):
+            self.flush()
+            return
+        self._ensure_worker()
+        if pending_count >= self.max_pending:
+            self._wakeup.set()
+
+    def _ensure_worker(self):
+        # Also restarts the worker in a process forked after it was started
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f'{self.name}-flusher', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing %s buffer failed', self.name)
+            finally:
+                close_old_connections()
+
+    def _flush_at_exit(self):
+        if not getattr(settings, 'WRITE_BEHIND_SYNCHRONOUS', False):
+            self.flush()
+
+    def flush(self):
+        """Write everything queued so far"""
+        with self.lock:
+            items = self.drain()
+        if items:
+            self.write(items)
+
+    def drain(self):
+        """Remove and return the pending items; called with self.lock held"""
+        raise NotImplementedError
+
+    def write(self, items):
+        """Persist drained items"""
+        raise NotImplementedError
+
+
+class SearchLogBuffer(WriteBehindBuffer):
+    """
+    Write-behind log of authenticated searches. Identical searches by the same user
+    inside the dedup window are logged once, and a search that only extends or trims
+    the location of the user's still-pending search (typing) replaces it.
+    """
+    name = 'search-log'
+
+    def __init__(self):
+        super().__init__()
+        self.flush_interval = getattr(settings, 'SEARCH_LOG_FLUSH_INTERVAL', 5)
+        self.max_pending = getattr(settings, 'SEARCH_LOG_BATCH_SIZE', 500)
+        self.dedup_window = getattr(settings, 'SEARCH_LOG_DEDUP_WINDOW', 300)
+        self._pending = {}  # (user_id, search key) -> UserSearch
+        self._last_logged = {}  # (user_id, search key) -> monotonic time
+        self._last_pending = {}  # (user_id, key without location) -> (search key, location)
+
+    def record(self, user_id, filters):
+        now = time.monotonic()
+        search_key = search_cache_key(filters)
+        base_key = search_cache_key({k: v for k, v in filters.items() if k != 'location'})
+        location = (filters.get('location') or '').strip().lower()
+
+        with self.lock:
+            last_logged = self._last_logged.get((user_id, search_key))
+            if last_logged is not None and now - last_logged < self.dedup_window:
+                return
+
+            previous = self._last_pending.get((user_id, base_key))
+            if previous is not None:
+                previous_key, previous_location = previous
+                # An empty location is a different search, not a shorter spelling of one
+                if location and previous_location and (
+                    location.startswith(previous_location) or previous_location.startswith(location)
+                ):
+                    self._pending.pop((user_id, previous_key), None)
+                    self._last_logged.pop((user_id, previous_key), None)
+
+            self._pending[(user_id, search_key)] = self.build_search(user_id, filters)
+            self._last_logged[(user_id, search_key)] = now
+            self._last_pending[(user_id, base_key)] = (search_key, location)
+            pending_count = len(self._pending)
+
+        self.notify(pending_count)
+
+    def build_search(self, user_id, filters):
+        return UserSearch(
+            user_id=user_id,
+            location=filters.get('location', ''),
+            min_rent=filters.get('min_rent'),
+            max_rent=filters.get('max_rent'),
+            bedrooms=filters.get('bedrooms'),
+            property_type_id=filters.get('property_type'),
+            furnishing_id=filters.get('furnishing'),
+            search_query=json.loads(json.dumps(filters, cls=DjangoJSONEncoder))
+        )
+
+    def drain(self):
+        pending, self._pending = self._pending, {}
+        self._last_pending = {}
+
+        cutoff = time.monotonic() - self.dedup_window
+        self._last_logged = {key: at for key, at in self._last_logged.items() if at >= cutoff}
+        return pending
+
+    def write(self, pending):
+        try:
+            with transaction.atomic():
+                UserSearch.objects.bulk_create(pending.values(), batch_size=self.max_pending)
+        except (IntegrityError, DataError):
+            # A row the database rejects would fail every later flush too: insert the
+            # batch row by row and drop only the rows that fail
+            for key, search in pending.items():
+                search.pk = None
+                try:
+                    with transaction.atomic():
+                        search.save(force_insert=True)
+                except (IntegrityError, DataError):
+                    logger.warning('Dropping search logged for user %s', key[0], exc_info=True)
+        except OperationalError:
+            # Transient (connection lost, server restarting): keep the searches for the
+            # next flush; a newer pending search with the same key takes precedence
+            with self.lock:
+                for key, search in pending.items():
+                    search.pk = None
+                    self._pending.setdefault(key, search)
+            raise
+
+
+class CounterBuffer(WriteBehindBuffer):
+    """
+    Accumulates increments per key and applies them with one UPDATE per distinct delta,
+    so a hot row takes one write per flush instead of one per event. Subclasses
+    implement apply().
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._counts = Counter()
+
+    def increment(self, key, amount=1):
+        with self.lock:
+            self._counts[key] += amount
+            pending_count = len(self._counts)
+        self.notify(pending_count)
+
+    def drain(self):
+        counts, self._counts = self._counts, Counter()
+        return counts
+
+    def write(self, counts):
+        keys_by_delta = defaultdict(list)
+        for key, delta in counts.items():
+            keys_by_delta[delta].append(key)
+
+        try:
+            with transaction.atomic():
+                for delta, keys in keys_by_delta.items():
+                    self.apply(sorted(keys), delta)
+        except DatabaseError:
+            # Keep the increments for the next flush instead of losing them
+            with self.lock:
+                self._counts.update(counts)
+            raise
+
+    def apply(self, keys, delta):
+        """Add delta to the counters of every key"""
+        raise NotImplementedError
+
+
+class ListingViewBuffer(CounterBuffer):
+    """
+    Detail page views per property, added to its active listings and its search
+    document. A visitor viewing the same property again within the dedup window
+    is not counted twice.
+    """
+    name = 'listing-views'
+
+    def __init__(self):
+        super().__init__()
+        self.flush_interval = getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 10)
+        self.dedup_window = getattr(settings, 'VIEW_COUNT_DEDUP_WINDOW', 1800)
+
+    def record(self, property_id, visitor=None):
+        if visitor is not None and self.dedup_window:
+            if not cache.add(f'property-viewed:{property_id}:{visitor}', True, self.dedup_window):
+                return
+        self.increment(property_id)
+
+    def apply(self, property_ids, delta):
+        Listing.objects.filter(property_id__in=property_ids, listing_status='active').update(
+            views_count=F('views_count') + delta
+        )
+        PropertySearchDocument.objects.filter(pk__in=property_ids).update(views_count=F('views_count') + delta)
+
+
+search_log = SearchLogBuffer()
+listing_views = ListingViewBuffer()
@@ -0,0 +1,129 @@
+# caching.py - Versioned result cache for property search and property details
+
+import hashlib
+import json
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+
+SEARCH_CACHE_TIMEOUT = 600  # seconds
+
+# Details embed counters and related names that change without invalidating them
+DETAIL_CACHE_TIMEOUT = 900  # seconds
+
+# Version scopes: one per city, one covering every city, one for the locality set,
+# and one per property and per user for cached details
+ALL_CITIES = '*'
+LOCALITY_SET = '#localities'
+
+
+def property_scope(property_id):
+    return f'#property:{property_id}'
+
+
+def user_scope(user_id):
+    return f'#user:{user_id}'
+
+
+def _version_key(scope):
+    return f'search-version:{scope.strip().lower()}'
+
+
+def _initial_version():
+    # Time-based so a version evicted from the cache never comes back as an old value
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    """Current version of each scope, initialising any that are missing"""
+    keys = {scope: _version_key(scope) for scope in scopes}
+    stored = cache.get_many(list(keys.values()))
+
+    versions = {}
+    for scope, key in keys.items():
+        if key not in stored:
+            cache.add(key, _initial_version(), None)
+            stored[key] = cache.get(key)
+        versions[scope] = stored[key]
+    return versions
+
+
+def bump_versions(scopes):
+    """Invalidate every cached search that depends on any of the given scopes"""
+    for scope in set(scopes):
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def bump_city_versions(cities):
+    """Called whenever search documents in these cities are written or removed"""
+    bump_versions([city for city in cities if city] + [ALL_CITIES])
+
+
+def bump_versions_on_commit(scopes):
+    """
+    Invalidate once the current transaction commits; bumping earlier would let a request
+    re-cache the old rows under the new version before they change.
+    """
+    scopes = list(scopes)
+    if scopes:
+        transaction.on_commit(lambda: bump_versions(scopes))
+
+
+def _canonical(value):
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, (list, tuple, set)):
+        return sorted(_canonical(item) for item in value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def search_cache_key(validated_data):
+    """Key for a validated search payload, independent of key order, case and number formatting"""
+    canonical = {
+        name: _canonical(value)
+        for name, value in validated_data.items()
+        if value not in (None, '', [])
+    }
+    digest = hashlib.sha1(json.dumps(canonical, sort_keys=True, default=str).encode()).hexdigest()
+    return f'property-search:{digest}'
+
+
+def search_page_cache_key(validated_data, page_url):
+    """Key for one page of a search; page_url carries the (case-sensitive) pagination parameters"""
+    digest = hashlib.sha1(page_url.encode()).hexdigest()
+    return f'{search_cache_key(validated_data)}:{digest}'
+
+
+def property_detail_cache_key(property_id, base_url, fieldset):
+    """Key for one rendering of a property's detail; media URLs are absolute, so per host"""
+    variant = json.dumps([base_url, *(sorted(names) if names is not None else None for names in fieldset)])
+    digest = hashlib.sha1(variant.encode()).hexdigest()
+    return f'property-detail:{property_id}:{digest}'
+
+
+def get_cached_result(cache_key):
+    """Cached result, or None if missing or any scope it depends on has changed"""
+    entry = cache.get(cache_key)
+    if entry is None:
+        return None
+    if get_versions(entry['versions']) != entry['versions']:
+        return None
+    return entry['result']
+
+
+def set_cached_result(cache_key, versions, result, timeout=SEARCH_CACHE_TIMEOUT):
+    """
+    Cache a result tagged with the scope versions read *before* it was computed,
+    so a write that lands while the query runs still invalidates it.
+    """
+    cache.set(cache_key, {'versions': versions, 'result': result}, timeout)
@@ -0,0 +1,87 @@
+# facets.py - Facet counts for the property filter sidebar
+
+import hashlib
+import json
+from decimal import Decimal
+
+from django.db.models import Count, Q
+from .models import Property, PropertyType, FurnishingType, Amenity
+
+FACET_CACHE_TIMEOUT = 300  # seconds
+
+BEDROOM_OPTIONS = [1, 2, 3, 4]
+BEDROOM_OVERFLOW = 5  # reported as "5+"
+
+# (label, min_rent inclusive, max_rent exclusive) in INR per month
+RENT_BUCKETS = [
+    ('0-10000', None, 10000),
+    ('10000-20000', 10000, 20000),
+    ('20000-35000', 20000, 35000),
+    ('35000-50000', 35000, 50000),
+    ('50000-100000', 50000, 100000),
+    ('100000+', 100000, None),
+]
+
+
+def facet_cache_key(cleaned_data):
+    """Cache key for a validated filter set, independent of parameter order and formatting"""
+    normalized = {}
+    for name, value in cleaned_data.items():
+        if value in (None, '', []):
+            continue
+        if hasattr(value, 'pk'):
+            value = value.pk
+        elif isinstance(value, Decimal):
+            value = value.normalize()
+        elif isinstance(value, str):
+            value = value.strip().lower()  # text filters are case-insensitive
+        normalized[name] = str(value)
+    digest = hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+    return f'property-facets:{digest}'
+
+
+def get_facet_options():
+    """Every (facet, value, label, condition) the sidebar can show"""
+    options = []
+
+    for bedrooms in BEDROOM_OPTIONS:
+        options.append(('bedrooms', bedrooms, str(bedrooms), Q(bedrooms=bedrooms)))
+    options.append(('bedrooms', BEDROOM_OVERFLOW, f'{BEDROOM_OVERFLOW}+', Q(bedrooms__gte=BEDROOM_OVERFLOW)))
+
+    for pk, name in PropertyType.objects.order_by('type_name').values_list('pk', 'type_name'):
+        options.append(('property_type', pk, name, Q(property_type_id=pk)))
+
+    for pk, name in FurnishingType.objects.order_by('furnishing_type').values_list('pk', 'furnishing_type'):
+        options.append(('furnishing', pk, name, Q(furnishing_id=pk)))
+
+    for value, label in Property.PREFERRED_TENANT_CHOICES:
+        options.append(('preferred_tenant', value, label, Q(preferred_tenant=value)))
+
+    for pk, name in Amenity.objects.order_by('amenity_name').values_list('pk', 'amenity_name'):
+        options.append(('amenities', pk, name, Q(amenity_ids__contains=[pk])))
+
+    for label, min_rent, max_rent in RENT_BUCKETS:
+        condition = Q()
+        if min_rent is not None:
+            condition &= Q(monthly_rent__gte=min_rent)
+        if max_rent is not None:
+            condition &= Q(monthly_rent__lt=max_rent)
+        options.append(('rent', label, label, condition))
+
+    return options
+
+
+def compute_facets(queryset):
+    """Count every facet option over a filtered search document queryset in one aggregate query"""
+    options = get_facet_options()
+    aggregates = {'total': Count('pk')}
+    for index, (facet, value, label, condition) in enumerate(options):
+        aggregates[f'option_{index}'] = Count('pk', filter=condition)
+
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    facets = {facet: [] for facet, _, _, _ in options}
+    for index, (facet, value, label, condition) in enumerate(options):
+        facets[facet].append({'value': value, 'label': label, 'count': counts[f'option_{index}']})
+
+    return {'total': counts['total'], 'facets': facets}
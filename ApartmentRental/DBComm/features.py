@@ -0,0 +1,153 @@
+# features.py - In-memory NumPy feature matrix over searchable properties
+
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+from .models import PropertySearchDocument
+
+FEATURE_REFRESH_INTERVAL = 30  # seconds between incremental refreshes
+# Re-read documents indexed shortly before the last refresh; their transactions may have
+# committed after it ran
+FEATURE_REFRESH_OVERLAP = timedelta(seconds=60)
+# Drop rows of delisted properties once they make up this share of the matrix
+FEATURE_COMPACT_RATIO = 0.25
+
+FEATURE_FIELDS = [
+    'pk', 'monthly_rent', 'bedrooms', 'bathrooms', 'total_area_sqft', 'latitude', 'longitude',
+    'property_type_id', 'furnishing_id', 'city', 'locality', 'amenity_ids', 'created_at', 'indexed_at',
+]
+
+FeatureSnapshot = namedtuple('FeatureSnapshot', [
+    'ids',              # int64 property IDs, one per row
+    'rows',             # property ID -> row
+    'alive',            # False for rows whose search document has been removed
+    'columns',          # column name -> array aligned with ids
+    'places',           # lowercased city / locality name -> code used in the city and locality columns
+    'amenity_columns',  # amenity ID -> column of the `amenities` matrix
+])
+
+
+def _number(value):
+    return np.nan if value is None else float(value)
+
+
+def _encode_rows(rows, places, amenity_columns):
+    """Column arrays for a batch of FEATURE_FIELDS rows, extending the vocabularies in place"""
+    def place_code(name):
+        return places.setdefault((name or '').strip().lower(), len(places))
+
+    for row in rows:
+        for amenity_id in row[11]:
+            amenity_columns.setdefault(amenity_id, len(amenity_columns))
+
+    amenities = np.zeros((len(rows), len(amenity_columns)), dtype=bool)
+    for index, row in enumerate(rows):
+        amenities[index, [amenity_columns[amenity_id] for amenity_id in row[11]]] = True
+
+    columns = {
+        'rent': np.array([float(row[1]) for row in rows], dtype=np.float64),
+        'bedrooms': np.array([row[2] for row in rows], dtype=np.float32),
+        'bathrooms': np.array([row[3] for row in rows], dtype=np.float32),
+        'area': np.array([_number(row[4]) for row in rows], dtype=np.float32),
+        'latitude': np.array([_number(row[5]) for row in rows], dtype=np.float64),
+        'longitude': np.array([_number(row[6]) for row in rows], dtype=np.float64),
+        'property_type': np.array([row[7] for row in rows], dtype=np.int64),
+        'furnishing': np.array([row[8] or 0 for row in rows], dtype=np.int64),
+        'city': np.array([place_code(row[9]) for row in rows], dtype=np.int32),
+        'locality': np.array([place_code(row[10]) for row in rows], dtype=np.int32),
+        'created': np.array([row[12].timestamp() for row in rows], dtype=np.float64),
+        'amenities': amenities,
+    }
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    return ids, columns
+
+
+def merge_snapshot(previous, rows, live_ids=None):
+    """
+    New snapshot with `rows` upserted into `previous` (which is left untouched, so readers
+    never see a half-applied refresh). Rows whose ID is missing from live_ids are marked dead.
+    """
+    places = dict(previous.places) if previous else {}
+    amenity_columns = dict(previous.amenity_columns) if previous else {}
+    batch_ids, batch = _encode_rows(rows, places, amenity_columns)
+
+    if previous is None:
+        ids, columns = batch_ids, batch
+    else:
+        width = len(amenity_columns)
+        columns = {}
+        for name, values in previous.columns.items():
+            if name == 'amenities' and values.shape[1] < width:
+                values = np.pad(values, ((0, 0), (0, width - values.shape[1])))
+            columns[name] = values.copy()
+
+        existing = np.array([previous.rows.get(pk, -1) for pk in batch_ids.tolist()], dtype=np.int64)
+        update = existing >= 0
+        for name, values in batch.items():
+            columns[name][existing[update]] = values[update]
+            columns[name] = np.concatenate([columns[name], values[~update]])
+        ids = np.concatenate([previous.ids, batch_ids[~update]])
+
+    if live_ids is not None:
+        alive = np.isin(ids, live_ids)
+    elif previous is not None:
+        alive = np.concatenate([previous.alive, np.ones(len(ids) - len(previous.ids), dtype=bool)])
+    else:
+        alive = np.ones(len(ids), dtype=bool)
+    alive[np.isin(ids, batch_ids)] = True
+
+    if len(ids) and (~alive).sum() > FEATURE_COMPACT_RATIO * len(ids):
+        ids = ids[alive]
+        columns = {name: values[alive] for name, values in columns.items()}
+        alive = np.ones(len(ids), dtype=bool)
+
+    rows_by_id = dict(zip(ids.tolist(), range(len(ids))))
+    return FeatureSnapshot(ids, rows_by_id, alive, columns, places, amenity_columns)
+
+
+class PropertyFeatures:
+    """
+    Feature matrix over every search document, kept per process. The first use loads all
+    documents; later refreshes only read documents re-indexed since the previous one plus
+    the list of live IDs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.indexed_through = None
+        self.refreshed_at = None
+
+    def get(self):
+        """Current snapshot, refreshed if older than FEATURE_REFRESH_INTERVAL"""
+        if self.is_stale():
+            with self.lock:
+                if self.is_stale():
+                    self.refresh()
+        return self.snapshot
+
+    def is_stale(self):
+        return self.snapshot is None or time.monotonic() - self.refreshed_at > FEATURE_REFRESH_INTERVAL
+
+    def refresh(self):
+        documents = PropertySearchDocument.objects.order_by()
+        live_ids = None
+        if self.indexed_through is not None:
+            documents = documents.filter(indexed_at__gte=self.indexed_through - FEATURE_REFRESH_OVERLAP)
+            live_ids = np.fromiter(
+                PropertySearchDocument.objects.order_by().values_list('pk', flat=True).iterator(),
+                dtype=np.int64
+            )
+        rows = list(documents.values_list(*FEATURE_FIELDS))
+
+        self.snapshot = merge_snapshot(self.snapshot, rows, live_ids)
+        if rows:
+            latest = max(row[-1] for row in rows)
+            self.indexed_through = max(latest, self.indexed_through) if self.indexed_through else latest
+        self.refreshed_at = time.monotonic()
+
+
+property_features = PropertyFeatures()
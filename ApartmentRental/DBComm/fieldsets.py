@@ -0,0 +1,38 @@
+# fieldsets.py - Sparse fieldsets (?fields=) and optional expansions (?expand=)
+
+from collections import namedtuple
+
+
+class Fieldset(namedtuple('Fieldset', ['fields', 'expand'])):
+    """
+    Keys a client asked for and relations it wants embedded; None means all of them.
+    The primary key is always included so clients can page and link.
+    """
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields or name == 'id'
+
+    def expands(self, name):
+        return self.includes(name) and (self.expand is None or name in self.expand)
+
+
+# Every key with every relation embedded: the payload without query parameters
+FULL_FIELDSET = Fieldset(None, None)
+
+
+def _names(value):
+    return frozenset(name.strip() for name in value.split(',') if name.strip())
+
+
+def requested_fieldset(request):
+    """
+    Fieldset from `?fields=id,title,...` and `?expand=address,...`. Without ?expand= every
+    expandable relation is embedded as before; with it, the others are reduced to their ID
+    (foreign keys) or left out (collections). Unknown names are ignored.
+    """
+    params = request.query_params
+    fields = _names(params['fields']) if params.get('fields') else None
+    expand = _names(params['expand']) if 'expand' in params else None
+    if fields is None and expand is None:
+        return FULL_FIELDSET
+    return Fieldset(fields, expand)
@@ -1,17 +1,51 @@
 # filters.py - Django Filters for Property Search
 
+import math
+import re
+
 import django_filters
-from django.db.models import Q
-from .models import Property, PropertyType, FurnishingType
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Q, F
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from .models import Property, PropertyType, FurnishingType, PropertySearchDocument
+from .search import SEARCH_CONFIG, matching_localities
+from .geo import (
+    radius_cover, bbox_cover, geohash_condition, radius_bounds, distance_km_expression
+)
+
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 50
+
+
+def parse_coordinates(value, count, param):
+    """Parse a comma-separated list of `count` floats, alternating latitude and longitude"""
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count or not all(math.isfinite(number) for number in numbers):
+        raise ValidationError({param: f'Expected {count} comma-separated numbers'})
+    if any(abs(latitude) > 90 for latitude in numbers[0::2]):
+        raise ValidationError({param: 'Latitudes must be between -90 and 90'})
+    if any(abs(longitude) > 180 for longitude in numbers[1::2]):
+        raise ValidationError({param: 'Longitudes must be between -180 and 180'})
+    return numbers
 
 
 class PropertyFilter(django_filters.FilterSet):
-    """Advanced filtering for properties"""
+    """Advanced filtering for properties, evaluated against the flat search document table"""
 
     # Location filters
     location = django_filters.CharFilter(method='filter_by_location')
-    city = django_filters.CharFilter(field_name='address__city', lookup_expr='icontains')
-    locality = django_filters.CharFilter(field_name='address__locality', lookup_expr='icontains')
+    city = django_filters.CharFilter(field_name='city', lookup_expr='icontains')
+    locality = django_filters.CharFilter(field_name='locality', lookup_expr='icontains')
+
+    # Map filters: ?near=lat,lng&radius_km=R or ?bbox=min_lat,min_lng,max_lat,max_lng
+    near = django_filters.CharFilter(method='filter_by_radius')
+    radius_km = django_filters.NumberFilter(method='filter_noop')
+    bbox = django_filters.CharFilter(method='filter_by_bbox')
 
     # Property characteristics
     property_type = django_filters.ModelChoiceFilter(queryset=PropertyType.objects.all())
@@ -23,9 +57,9 @@ class PropertyFilter(django_filters.FilterSet):
     min_area = django_filters.NumberFilter(field_name='total_area_sqft', lookup_expr='gte')
     max_area = django_filters.NumberFilter(field_name='total_area_sqft', lookup_expr='lte')
 
-    # Rent filters (from active listings)
-    min_rent = django_filters.NumberFilter(method='filter_by_min_rent')
-    max_rent = django_filters.NumberFilter(method='filter_by_max_rent')
+    # Rent filters (from the active listing)
+    min_rent = django_filters.NumberFilter(field_name='monthly_rent', lookup_expr='gte')
+    max_rent = django_filters.NumberFilter(field_name='monthly_rent', lookup_expr='lte')
 
     # Availability filters
     available_from = django_filters.DateFilter(field_name='available_from', lookup_expr='lte')
@@ -43,46 +77,71 @@ class PropertyFilter(django_filters.FilterSet):
     furnished = django_filters.BooleanFilter(method='filter_furnished')
 
     class Meta:
-        model = Property
+        model = PropertySearchDocument
         fields = []
 
     def filter_by_location(self, queryset, name, value):
-        """Filter by location (city, locality, or address)"""
+        """Filter by location (city, locality, or address) using the trigram indexes"""
         return queryset.filter(
-            Q(address__city__icontains=value) |
-            Q(address__locality__icontains=value) |
-            Q(address__street_address__icontains=value)
+            Q(locality_record__in=matching_localities(value, include_state=False)) |
+            Q(street_address__icontains=value)
         )
 
-    def filter_by_min_rent(self, queryset, name, value):
-        """Filter by minimum rent from active listings"""
-        return queryset.filter(
-            listings__listing_status='active',
-            listings__monthly_rent__gte=value
-        )
+    def filter_noop(self, queryset, name, value):
+        """Parameter consumed by another filter method"""
+        return queryset
 
-    def filter_by_max_rent(self, queryset, name, value):
-        """Filter by maximum rent from active listings"""
+    def filter_by_radius(self, queryset, name, value):
+        """Properties within radius_km of a point, nearest first"""
+        latitude, longitude = parse_coordinates(value, 2, name)
+        radius = float(self.form.cleaned_data.get('radius_km') or DEFAULT_RADIUS_KM)
+        radius = min(max(radius, 0.1), MAX_RADIUS_KM)
+
+        cells = radius_cover(latitude, longitude, radius)
+        if cells:
+            queryset = queryset.filter(geohash_condition(cells))
+
+        min_lat, min_lng, max_lat, max_lng = radius_bounds(latitude, longitude, radius)
         return queryset.filter(
-            listings__listing_status='active',
-            listings__monthly_rent__lte=value
-        )
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lng, max_lng)
+        ).annotate(
+            distance_km=distance_km_expression(latitude, longitude)
+        ).filter(distance_km__lte=radius).order_by('distance_km', 'pk')
+
+    def filter_by_bbox(self, queryset, name, value):
+        """Properties inside a map viewport, nearest to its centre first"""
+        min_lat, min_lng, max_lat, max_lng = parse_coordinates(value, 4, name)
+        if min_lat > max_lat:
+            raise ValidationError({name: 'min_lat must not exceed max_lat'})
+
+        cells = bbox_cover(min_lat, min_lng, max_lat, max_lng)
+        if cells:
+            queryset = queryset.filter(geohash_condition(cells))
+
+        queryset = queryset.filter(latitude__range=(min_lat, max_lat))
+        if min_lng <= max_lng:
+            queryset = queryset.filter(longitude__range=(min_lng, max_lng))
+        else:
+            queryset = queryset.filter(Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng))
+
+        center_lng = (min_lng + max_lng) / 2 if min_lng <= max_lng else (min_lng + max_lng + 360) / 2
+        return queryset.annotate(
+            distance_km=distance_km_expression((min_lat + max_lat) / 2, center_lng)
+        ).order_by('distance_km', 'pk')
 
     def filter_immediately_available(self, queryset, name, value):
         """Filter properties available immediately"""
         if value:
-            return queryset.filter(
-                listings__listing_status='active',
-                listings__immediately_available=True
-            )
+            return queryset.filter(immediately_available=True)
         return queryset
 
     def filter_by_amenities(self, queryset, name, value):
         """Filter by comma-separated amenity IDs"""
         if value:
             amenity_ids = [int(id.strip()) for id in value.split(',') if id.strip().isdigit()]
-            for amenity_id in amenity_ids:
-                queryset = queryset.filter(amenities__id=amenity_id)
+            if amenity_ids:
+                queryset = queryset.filter(amenity_ids__contains=amenity_ids)
         return queryset
 
     def filter_by_tenant_preference(self, queryset, name, value):
@@ -101,8 +160,63 @@ class PropertyFilter(django_filters.FilterSet):
         """Filter furnished properties"""
         if value:
             return queryset.filter(
-                furnishing__furnishing_type__in=['Fully Furnished', 'Semi Furnished']
+                furnishing_type_name__in=['Fully Furnished', 'Semi Furnished']
             )
         else:
-            return queryset.filter(furnishing__furnishing_type='Unfurnished')
-        return queryset
\ No newline at end of file
+            return queryset.filter(furnishing_type_name='Unfurnished')
+        return queryset
+
+
+class FullTextSearchFilter(filters.BaseFilterBackend):
+    """
+    Full-text search over the stored, GIN-indexed search vector.
+    Every term is matched as a prefix so partially typed words still hit the index,
+    and results are ranked by ts_rank unless the client asks for another ordering.
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def get_search_query(self, request):
+        terms = re.findall(r'\w+', request.query_params.get(self.search_param, ''))
+        if not terms:
+            return None
+        return SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms),
+            search_type='raw',
+            config=SEARCH_CONFIG
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if query is None:
+            return queryset
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-pk')
+
+
+class PropertyOrderingFilter(filters.OrderingFilter):
+    """
+    Ordering filter that keeps relevance ordering applied by an earlier backend and adds a
+    primary key tie-breaker in the direction of the last sort key, so each sort walks one
+    (key, pk) index and pages are stable.
+    """
+    # Sort keys that may be NULL; rows without a value go last in both directions
+    nulls_last_fields = {'price_per_sqft', 'average_rating'}
+
+    def filter_queryset(self, request, queryset, view):
+        if queryset.query.order_by and self.ordering_param not in request.query_params:
+            return queryset
+
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+
+        if ordering[-1].lstrip('-') not in ('pk', queryset.model._meta.pk.name):
+            ordering = [*ordering, '-pk' if ordering[-1].startswith('-') else 'pk']
+        return queryset.order_by(*[self.get_order_expression(term) for term in ordering])
+
+    def get_order_expression(self, term):
+        name = term.lstrip('-')
+        if name not in self.nulls_last_fields:
+            return term
+        return F(name).desc(nulls_last=True) if term.startswith('-') else F(name).asc(nulls_last=True)
@@ -0,0 +1,134 @@
+# geo.py - Geohash covering and great-circle distance helpers for map search
+
+import math
+
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# Precision stored on search documents (~5 m cells); covers use shorter prefixes
+GEOHASH_PRECISION = 9
+MAX_COVER_PRECISION = 7
+MAX_BBOX_COVER_CELLS = 32
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base32 geohash of a point"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars, bits, bit_count, even = [], 0, 0, True
+
+    while len(chars) < precision:
+        target, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (target[0] + target[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            target[0] = mid
+        else:
+            bits <<= 1
+            target[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def _clamp_latitude(latitude):
+    return max(-90.0, min(90.0, latitude))
+
+
+def _wrap_longitude(longitude):
+    return (longitude + 180.0) % 360.0 - 180.0
+
+
+def radius_cover(latitude, longitude, radius_km):
+    """Geohash prefixes whose cells together contain the circle (centre cell and its 8 neighbours)"""
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    precision = None
+    for candidate in range(MAX_COVER_PRECISION, 0, -1):
+        height, width = cell_size(candidate)
+        if height * KM_PER_DEGREE >= radius_km and width * KM_PER_DEGREE * cos_lat >= radius_km:
+            precision = candidate
+            break
+    if precision is None:
+        return None
+
+    height, width = cell_size(precision)
+    return {
+        encode_geohash(
+            _clamp_latitude(latitude + d_lat * height),
+            _wrap_longitude(longitude + d_lng * width),
+            precision
+        )
+        for d_lat in (-1, 0, 1)
+        for d_lng in (-1, 0, 1)
+    }
+
+
+def bbox_cover(min_lat, min_lng, max_lat, max_lng):
+    """Smallest set of geohash prefixes (at most MAX_BBOX_COVER_CELLS) covering a viewport"""
+    if min_lng > max_lng:
+        return None  # viewport crosses the antimeridian; fall back to the range filter alone
+
+    for precision in range(MAX_COVER_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = math.floor(max_lng / width) - math.floor(min_lng / width) + 1
+        if rows * cols > MAX_BBOX_COVER_CELLS:
+            continue
+        lat_start = math.floor(min_lat / height) * height
+        lng_start = math.floor(min_lng / width) * width
+        return {
+            encode_geohash(
+                _clamp_latitude(lat_start + (row + 0.5) * height),
+                _wrap_longitude(lng_start + (col + 0.5) * width),
+                precision
+            )
+            for row in range(rows)
+            for col in range(cols)
+        }
+    return None
+
+
+def geohash_condition(prefixes, field_name='geohash'):
+    """OR of prefix matches, each served by the varchar_pattern_ops index"""
+    condition = Q()
+    for prefix in sorted(prefixes):
+        condition |= Q(**{f'{field_name}__startswith': prefix})
+    return condition
+
+
+def radius_bounds(latitude, longitude, radius_km):
+    """Bounding box (min_lat, min_lng, max_lat, max_lng) of a circle"""
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return latitude - d_lat, longitude - d_lng, latitude + d_lat, longitude + d_lng
+
+
+def distance_km_expression(latitude, longitude, lat_field='latitude', lng_field='longitude'):
+    """Haversine distance in km from a fixed point to each row's coordinates"""
+    origin_lat = math.radians(latitude)
+    origin_lng = math.radians(longitude)
+    row_lat = Radians(Cast(lat_field, FloatField()))
+    row_lng = Radians(Cast(lng_field, FloatField()))
+
+    half_chord = (
+        Power(Sin((row_lat - Value(origin_lat)) / Value(2.0)), 2) +
+        Value(math.cos(origin_lat)) * Cos(row_lat) *
+        Power(Sin((row_lng - Value(origin_lng)) / Value(2.0)), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(Value(1.0), half_chord)))
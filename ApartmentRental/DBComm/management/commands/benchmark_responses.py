@@ -0,0 +1,103 @@
+# benchmark_responses.py - Compare payload size and latency of the property endpoints
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from DBComm.buffers import listing_views
+from DBComm.caching import bump_versions, property_scope
+from DBComm.models import Property, PropertySearchDocument
+from DBComm.readers import property_list_reader
+from DBComm.renderers import FastJSONRenderer
+from DBComm.serializers import PropertyDetailSerializer
+
+ENCODINGS = ('identity', 'gzip', 'br')
+
+
+def timings(samples):
+    """Mean and 95th percentile in milliseconds"""
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return statistics.mean(samples) * 1000, p95 * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure response bytes and latency of the property list and detail endpoints for each '
+        'content encoding, and compare JSONRenderer with FastJSONRenderer on the same payloads. '
+        'Requests run against the configured database and cache: the detail cache entries of the '
+        'benchmarked property are invalidated before every sample, and its views are not counted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint and encoding')
+        parser.add_argument('--page-size', type=int, default=20, help='Page size of the list endpoint')
+        parser.add_argument('--property', type=int, help='Property used for the detail endpoint')
+        parser.add_argument('--host', default='localhost', help='Host header (must be in ALLOWED_HOSTS)')
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        property_id = options['property'] or PropertySearchDocument.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ).first()
+        if property_id is None:
+            raise CommandError('No searchable property to benchmark; pass --property')
+
+        # The detail endpoint is cached; invalidating it before each sample measures
+        # building and rendering the payload rather than cache hits
+        endpoints = [
+            ('list', reverse('dbcomm:property_list'), {'page_size': options['page_size']}, []),
+            ('detail', reverse('dbcomm:property_detail', args=[property_id]), {}, [property_scope(property_id)]),
+        ]
+        client = Client(HTTP_HOST=options['host'])
+
+        # Views are written by a background thread outside any transaction, so they are
+        # not recorded at all rather than discarded afterwards
+        listing_views.record = lambda property_id, visitor=None: None
+        try:
+            self.measure_endpoints(client, endpoints, requests)
+        finally:
+            del listing_views.record
+
+        self.stdout.write('')
+        self.stdout.write(f'{"payload":<10}{"renderer":<20}{"mean ms":>10}{"p95 ms":>10}')
+        page = PropertySearchDocument.objects.order_by('-created_at').values_list('pk', flat=True)
+        instance = Property.objects.get(pk=property_id)
+        payloads = [
+            ('list', {'results': property_list_reader().read(page[:options['page_size']])}),
+            ('detail', PropertyDetailSerializer(instance).data),
+        ]
+        for name, data in payloads:
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                samples = []
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    renderer.render(data)
+                    samples.append(time.perf_counter() - started)
+                mean, p95 = timings(samples)
+                self.stdout.write(f'{name:<10}{type(renderer).__name__:<20}{mean:>10.3f}{p95:>10.3f}')
+
+    def measure_endpoints(self, client, endpoints, requests):
+        """Bytes and latency per endpoint and content encoding"""
+        self.stdout.write(f'{"endpoint":<10}{"encoding":<10}{"bytes":>10}{"mean ms":>10}{"p95 ms":>10}')
+        for name, url, params, cached_scopes in endpoints:
+            for encoding in ENCODINGS:
+                client.get(url, params, HTTP_ACCEPT_ENCODING=encoding)  # warm up
+                samples = []
+                for _ in range(requests):
+                    bump_versions(cached_scopes)
+                    started = time.perf_counter()
+                    response = client.get(url, params, HTTP_ACCEPT_ENCODING=encoding)
+                    samples.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code}')
+
+                served = response.get('Content-Encoding', 'identity')
+                label = encoding if served == encoding else f'{encoding}*'
+                mean, p95 = timings(samples)
+                self.stdout.write(f'{name:<10}{label:<10}{len(response.content):>10}{mean:>10.2f}{p95:>10.2f}')
+
+        self.stdout.write('* not applied: below COMPRESSION_MIN_LENGTH, or brotli is not installed')
@@ -0,0 +1,309 @@
+# import_properties.py - Bulk-load properties with their address, listing, amenities and images
+
+import csv
+import json
+import sys
+import time
+from collections import namedtuple
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction, DatabaseError
+from DBComm.models import (
+    User, Address, PropertyType, FurnishingType, Amenity, Property, PropertyAmenity, Listing, PropertyImage
+)
+from DBComm.search import schedule_search_document_refresh
+
+# Maintained by the application, never imported
+SKIPPED_FIELDS = {'id', 'created_at', 'updated_at', 'rating_count', 'rating_sum', 'views_count', 'contact_count'}
+
+# Keys an image given as a JSON object may set; order and primary flag follow its position
+IMAGE_FIELDS = {'image', 'image_type', 'caption'}
+
+# Separates amenity names and images within one CSV cell
+LIST_SEPARATOR = '|'
+
+# Spellings accepted for boolean columns, besides what BooleanField itself takes
+BOOLEAN_VALUES = {'true': True, 'yes': True, 'y': True, 'false': False, 'no': False, 'n': False}
+
+ImportRow = namedtuple('ImportRow', ['line', 'address', 'property', 'listing', 'amenity_ids', 'images'])
+
+
+def importable_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.is_relation and field.name not in SKIPPED_FIELDS
+    ]
+
+
+def field_values(fields, values):
+    """Keyword arguments for a model from the row values of its importable fields"""
+    kwargs = {}
+    for field in fields:
+        value = values.get(field.name)
+        if value is None:
+            continue
+        if field.get_internal_type() == 'BooleanField' and isinstance(value, str):
+            value = BOOLEAN_VALUES.get(value.strip().lower(), value)
+        kwargs[field.name] = value
+    return kwargs
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def as_list(value):
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in str(value).split(LIST_SEPARATOR) if item.strip()]
+
+
+def error_message(exc):
+    if isinstance(exc, ValidationError) and hasattr(exc, 'message_dict'):
+        return '; '.join(f'{field}: {" ".join(messages)}' for field, messages in exc.message_dict.items())
+    if isinstance(exc, ValidationError):
+        return ' '.join(exc.messages)
+    return str(exc).strip()
+
+
+class Command(BaseCommand):
+    help = (
+        'Import properties from a CSV or JSON Lines file (one property per row, with its address, '
+        'listing, amenity names and image paths). Rows are validated and loaded in batches; invalid '
+        'rows are reported and skipped without aborting the rest of their batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file, or '-' for standard input")
+        parser.add_argument(
+            '--format', choices=['csv', 'jsonl'], help='Input format (default: from the file extension)'
+        )
+        parser.add_argument('--owner', help="Username owning the properties, unless a row has an 'owner' column")
+        parser.add_argument(
+            '--allow-no-owner', action='store_true', help='Import rows without an owner instead of rejecting them'
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows validated and inserted per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing anything')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        self.dry_run = options['dry_run']
+        self.allow_no_owner = options['allow_no_owner']
+        self.unreadable = 0  # lines rejected before they become rows
+
+        # Lookup tables are small; resolve names from memory instead of per-row queries
+        self.property_types = {name.lower(): pk for pk, name in PropertyType.objects.values_list('pk', 'type_name')}
+        self.furnishing_types = {
+            name.lower(): pk for pk, name in FurnishingType.objects.values_list('pk', 'furnishing_type')
+        }
+        self.amenities = {name.lower(): pk for pk, name in Amenity.objects.values_list('pk', 'amenity_name')}
+        self.owners = {}
+        self.default_owner = options['owner']
+        if self.default_owner:
+            self.resolve_owners([self.default_owner])
+            if self.default_owner not in self.owners:
+                raise CommandError(f'Unknown owner: {self.default_owner}')
+
+        self.address_fields = importable_fields(Address)
+        self.property_fields = importable_fields(Property)
+        self.listing_fields = importable_fields(Listing)
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        started = time.monotonic()
+        imported = failed = 0
+        try:
+            for batch in batched(self.read_rows(stream, input_format), options['batch_size']):
+                batch_started = time.monotonic()
+                self.resolve_owners(row.get('owner') for _, row in batch)
+
+                prepared = []
+                for line, row in batch:
+                    try:
+                        prepared.append(self.prepare(line, row))
+                    except (ValidationError, ValueError) as exc:
+                        self.report(line, exc)
+                loaded = self.load(prepared)
+
+                imported += loaded
+                failed += len(batch) - loaded
+                if options['verbosity'] >= 2:
+                    elapsed = time.monotonic() - batch_started
+                    self.stdout.write(f'Batch of {len(batch)}: {loaded} imported ({len(batch) / elapsed:.0f} rows/s)')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        failed += self.unreadable
+        elapsed = time.monotonic() - started
+        rate = (imported + failed) / elapsed if elapsed else 0
+        verb = 'Validated' if self.dry_run else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {imported} properties, {failed} rows failed, in {elapsed:.1f}s ({rate:.0f} rows/s)'
+        ))
+
+    def read_rows(self, stream, input_format):
+        """(line number, dict) pairs, read lazily so memory use is independent of the file size"""
+        if input_format == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as exc:
+                self.report(line, exc)
+                self.unreadable += 1
+                continue
+            if not isinstance(row, dict):
+                self.report(line, ValueError('Expected a JSON object'))
+                self.unreadable += 1
+                continue
+            yield line, row
+
+    def resolve_owners(self, usernames):
+        """Look up, in one query, the owners of a batch that have not been seen yet"""
+        missing = {
+            username for username in usernames
+            if isinstance(username, str) and username and username not in self.owners
+        }
+        if missing:
+            self.owners.update(User.objects.filter(username__in=missing).values_list('username', 'pk'))
+
+    def prepare(self, line, row):
+        """Validated, unsaved model instances for one row (raises ValidationError)"""
+        values = {key: value for key, value in row.items() if value not in (None, '')}
+        errors = {}
+
+        owner_name = values.get('owner') or self.default_owner
+        owner_id = self.owners.get(owner_name) if isinstance(owner_name, str) else None
+        if owner_name is not None and not isinstance(owner_name, str):
+            errors['owner'] = ['Owner must be a username']
+        elif owner_name and owner_id is None:
+            errors['owner'] = [f'Unknown user "{owner_name}"']
+        elif not owner_name and not self.allow_no_owner:
+            errors['owner'] = ["No owner; pass --owner, add an 'owner' column or use --allow-no-owner"]
+        property_type_id = self.property_types.get(str(values.get('property_type', '')).lower())
+        if property_type_id is None:
+            errors['property_type'] = [f'Unknown property type "{values.get("property_type", "")}"']
+        furnishing_id = None
+        if 'furnishing' in values:
+            furnishing_id = self.furnishing_types.get(str(values['furnishing']).lower())
+            if furnishing_id is None:
+                errors['furnishing'] = [f'Unknown furnishing type "{values["furnishing"]}"']
+
+        amenity_ids = set()
+        for name in as_list(values.get('amenities', [])):
+            amenity_id = self.amenities.get(str(name).lower())
+            if amenity_id is None:
+                errors.setdefault('amenities', []).append(f'Unknown amenity "{name}"')
+            else:
+                amenity_ids.add(amenity_id)
+
+        address = Address(**field_values(self.address_fields, values))
+        property_obj = Property(
+            owner_id=owner_id, property_type_id=property_type_id, furnishing_id=furnishing_id,
+            **field_values(self.property_fields, values)
+        )
+        # A listing is created for rows that carry a rent
+        listing = None
+        if 'monthly_rent' in values:
+            listing = Listing(**field_values(self.listing_fields, values))
+
+        images = []
+        for position, spec in enumerate(as_list(values.get('images', []))):
+            try:
+                images.append(self.image(position, spec))
+            except ValidationError as exc:
+                errors.setdefault('images', []).extend(exc.messages)
+
+        for instance in filter(None, [address, property_obj, listing, *images]):
+            try:
+                instance.full_clean(
+                    exclude=[field.name for field in instance._meta.concrete_fields if field.is_relation],
+                    validate_unique=False, validate_constraints=False
+                )
+            except ValidationError as exc:
+                for field, messages in exc.message_dict.items():
+                    errors.setdefault(field, []).extend(messages)
+        if errors:
+            raise ValidationError(errors)
+        return ImportRow(line, address, property_obj, listing, amenity_ids, images)
+
+    def image(self, position, spec):
+        """An image given as "path", "image_type=path" or {"image": ..., "image_type": ..., "caption": ...}"""
+        if isinstance(spec, dict):
+            unknown = sorted(map(str, set(spec) - IMAGE_FIELDS))
+            if unknown:
+                raise ValidationError(f'Image {position + 1}: unknown keys {", ".join(unknown)}')
+            if not all(isinstance(value, str) for value in spec.values()):
+                raise ValidationError(f'Image {position + 1}: values must be strings')
+            fields = dict(spec)
+        else:
+            image_type, _, name = str(spec).rpartition('=')
+            fields = {'image': name, 'image_type': image_type or 'main'}
+        fields.setdefault('image_type', 'main')
+        # Files are expected in media storage already; only their names are recorded
+        return PropertyImage(image_order=position, is_primary=position == 0, **fields)
+
+    def load(self, rows):
+        """Insert the rows in one transaction; on failure retry them one by one. Returns rows loaded."""
+        if self.dry_run or not rows:
+            return len(rows)
+
+        try:
+            with transaction.atomic():
+                self.insert(rows)
+            return len(rows)
+        except DatabaseError:
+            pass
+
+        # Isolate the offending rows; the rest of the batch is still loaded
+        loaded = 0
+        for row in rows:
+            for instance in filter(None, [row.address, row.property, row.listing, *row.images]):
+                instance.pk = None
+                instance._state.adding = True
+            try:
+                with transaction.atomic():
+                    self.insert([row])
+                loaded += 1
+            except DatabaseError as exc:
+                self.report(row.line, exc)
+        return loaded
+
+    def insert(self, rows):
+        Address.objects.bulk_create([row.address for row in rows])
+        for row in rows:
+            row.property.address = row.address
+        Property.objects.bulk_create([row.property for row in rows])
+
+        listings, images, amenities = [], [], []
+        for row in rows:
+            if row.listing is not None:
+                row.listing.property = row.property
+                listings.append(row.listing)
+            for image in row.images:
+                image.property = row.property
+                images.append(image)
+            amenities.extend(
+                PropertyAmenity(property=row.property, amenity_id=amenity_id, available=True)
+                for amenity_id in row.amenity_ids
+            )
+        Listing.objects.bulk_create(listings)
+        PropertyImage.objects.bulk_create(images)
+        PropertyAmenity.objects.bulk_create(amenities)
+
+        # bulk_create sends no signals; build the search documents once the batch commits
+        schedule_search_document_refresh([row.property.pk for row in rows])
+
+    def report(self, line, exc):
+        self.stderr.write(f'Line {line}: {error_message(exc)}')
@@ -0,0 +1,40 @@
+# rebuild_search_documents.py - Backfill or repair the property search document table
+
+from django.core.management.base import BaseCommand
+from DBComm.models import Property, PropertySearchDocument
+from DBComm.search import refresh_search_documents, SEARCH_DOCUMENT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Rebuild property search documents from the properties, listings and addresses tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEARCH_DOCUMENT_BATCH_SIZE,
+            help='Number of properties rebuilt per batch'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        property_ids = Property.objects.order_by('pk').values_list('pk', flat=True)
+
+        # Existing listings are not new; rebuilding must not send listing alerts
+        batch, processed = [], 0
+        for property_id in property_ids.iterator(chunk_size=batch_size):
+            batch.append(property_id)
+            if len(batch) >= batch_size:
+                refresh_search_documents(batch, notify=False)
+                processed += len(batch)
+                batch = []
+        if batch:
+            refresh_search_documents(batch, notify=False)
+            processed += len(batch)
+
+        # Documents whose property no longer exists are removed by the FK cascade,
+        # so the table now mirrors the source tables exactly.
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt search documents for {processed} properties '
+            f'({PropertySearchDocument.objects.count()} searchable)'
+        ))
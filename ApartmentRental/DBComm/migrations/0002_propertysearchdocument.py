@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:51
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DBComm', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertySearchDocument',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='DBComm.property')),
+                ('title', models.CharField(max_length=200)),
+                ('property_type_name', models.CharField(max_length=50)),
+                ('furnishing_type_name', models.CharField(blank=True, max_length=50, null=True)),
+                ('bedrooms', models.PositiveIntegerField()),
+                ('bathrooms', models.PositiveIntegerField()),
+                ('total_area_sqft', models.PositiveIntegerField(blank=True, null=True)),
+                ('preferred_tenant', models.CharField(blank=True, max_length=20, null=True)),
+                ('parking_available', models.BooleanField(default=False)),
+                ('available_from', models.DateField(blank=True, null=True)),
+                ('monthly_rent', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('security_deposit', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('negotiable', models.BooleanField(default=True)),
+                ('immediately_available', models.BooleanField(default=True)),
+                ('street_address', models.CharField(max_length=255)),
+                ('locality', models.CharField(max_length=100)),
+                ('city', models.CharField(max_length=100)),
+                ('state', models.CharField(max_length=100)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=8, max_digits=10, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=8, max_digits=11, null=True)),
+                ('amenity_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, size=None)),
+                ('primary_image_url', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+                ('furnishing', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='search_documents', to='DBComm.furnishingtype')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='DBComm.listing')),
+                ('property_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='DBComm.propertytype')),
+            ],
+            options={
+                'verbose_name': 'Property Search Document',
+                'verbose_name_plural': 'Property Search Documents',
+                'db_table': 'property_search_documents',
+                'indexes': [models.Index(fields=['-created_at'], name='property_se_created_f9a8ec_idx'), models.Index(fields=['monthly_rent'], name='property_se_monthly_4a4ebc_idx'), models.Index(fields=['city', 'monthly_rent'], name='property_se_city_d3e2c5_idx'), models.Index(fields=['locality'], name='property_se_localit_ce98cf_idx'), models.Index(fields=['bedrooms', 'monthly_rent'], name='property_se_bedroom_0056de_idx'), models.Index(fields=['property_type', 'monthly_rent'], name='property_se_propert_835cd2_idx')],
+            },
+        ),
+    ]
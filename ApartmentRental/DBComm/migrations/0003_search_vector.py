@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:52
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_search_vectors(apps, schema_editor):
+    # Same weights as search.search_document_vector()
+    PropertySearchDocument = apps.get_model('DBComm', 'PropertySearchDocument')
+    Property = apps.get_model('DBComm', 'Property')
+
+    description = Subquery(Property.objects.filter(pk=OuterRef('pk')).values('description')[:1])
+    PropertySearchDocument.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='english') +
+        SearchVector('locality', 'city', weight='B', config='english') +
+        SearchVector(description, weight='C', config='english') +
+        SearchVector('street_address', 'state', weight='D', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DBComm', '0002_propertysearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertysearchdocument',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='search_doc_vector_gin'),
+        ),
+    ]
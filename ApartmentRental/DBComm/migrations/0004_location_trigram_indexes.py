@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:53
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_localities(apps, schema_editor):
+    """Keep the oldest of each (locality_name, city, state) group and repoint references to it"""
+    Locality = apps.get_model('DBComm', 'Locality')
+    relations = [relation for relation in Locality._meta.related_objects if not relation.many_to_many]
+
+    duplicates = Locality.objects.values('locality_name', 'city', 'state').annotate(
+        count=Count('pk'), keep=Min('pk')
+    ).filter(count__gt=1)
+    for group in duplicates:
+        merged = list(Locality.objects.filter(
+            locality_name=group['locality_name'], city=group['city'], state=group['state']
+        ).exclude(pk=group['keep']).values_list('pk', flat=True))
+        for relation in relations:
+            relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': merged}).update(
+                **{relation.field.name: group['keep']}
+            )
+        Locality.objects.filter(pk__in=merged).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DBComm', '0003_search_vector'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name='propertysearchdocument',
+            name='locality_record',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='search_documents', to='DBComm.locality'),
+        ),
+        migrations.AddIndex(
+            model_name='locality',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('locality_name'), name='gin_trgm_ops'), name='localities_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='locality',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('city'), name='gin_trgm_ops'), name='localities_city_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='locality',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('state'), name='gin_trgm_ops'), name='localities_state_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('street_address'), name='gin_trgm_ops'), name='search_doc_street_trgm'),
+        ),
+        migrations.RunPython(merge_duplicate_localities, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='locality',
+            constraint=models.UniqueConstraint(fields=('locality_name', 'city', 'state'), name='unique_locality_per_city'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DBComm', '0004_location_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='propertyinquiry',
+            name='property_in_inquire_022a18_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='propertysearchdocument',
+            name='property_se_created_f9a8ec_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reviewrating',
+            name='reviews_rat_propert_13834b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='propertyinquiry',
+            index=models.Index(fields=['inquirer', '-inquiry_date', '-id'], name='property_in_inquire_eb3856_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertyinquiry',
+            index=models.Index(fields=['property', '-inquiry_date', '-id'], name='property_in_propert_d9b8f2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=models.Index(fields=['-created_at', '-property'], name='property_se_created_8c6e9b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewrating',
+            index=models.Index(fields=['property', '-created_at', '-id'], name='reviews_rat_propert_d2729d_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:55
+
+from django.db import migrations, models
+
+from DBComm.geo import encode_geohash
+
+
+def backfill_geohashes(apps, schema_editor):
+    PropertySearchDocument = apps.get_model('DBComm', 'PropertySearchDocument')
+
+    documents = PropertySearchDocument.objects.filter(latitude__isnull=False, longitude__isnull=False).only(
+        'pk', 'latitude', 'longitude'
+    )
+    batch = []
+    for document in documents.iterator(chunk_size=1000):
+        document.geohash = encode_geohash(document.latitude, document.longitude)
+        batch.append(document)
+        if len(batch) >= 1000:
+            PropertySearchDocument.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    PropertySearchDocument.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DBComm', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertysearchdocument',
+            name='geohash',
+            field=models.CharField(blank=True, max_length=12, null=True),
+        ),
+        migrations.RunPython(backfill_geohashes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=models.Index(fields=['geohash'], name='search_doc_geohash', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:55
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DBComm', '0006_search_document_geohash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['amenity_ids'], name='search_doc_amenities_gin'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DBComm', '0008_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=models.Index(fields=['indexed_at'], name='property_se_indexed_5fbd8f_idx'),
+        ),
+    ]
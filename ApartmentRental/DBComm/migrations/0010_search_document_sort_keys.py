@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:05
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery
+
+
+def backfill_sort_keys(apps, schema_editor):
+    PropertySearchDocument = apps.get_model('DBComm', 'PropertySearchDocument')
+    Listing = apps.get_model('DBComm', 'Listing')
+
+    PropertySearchDocument.objects.update(
+        views_count=Subquery(Listing.objects.filter(pk=OuterRef('listing_id')).values('views_count')[:1])
+    )
+    PropertySearchDocument.objects.filter(total_area_sqft__gt=0).update(
+        price_per_sqft=ExpressionWrapper(
+            F('monthly_rent') / F('total_area_sqft'),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DBComm', '0009_search_document_indexed_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='propertysearchdocument',
+            name='property_se_monthly_4a4ebc_idx',
+        ),
+        migrations.AddField(
+            model_name='propertysearchdocument',
+            name='price_per_sqft',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='propertysearchdocument',
+            name='views_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_sort_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=models.Index(fields=['monthly_rent', 'property'], name='property_se_monthly_d5b3ce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=models.Index(fields=['views_count', 'property'], name='property_se_views_c_3403b2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=models.Index(fields=['price_per_sqft', 'property'], name='property_se_price_p_5ab58b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=models.Index(models.OrderBy(models.F('price_per_sqft'), descending=True, nulls_last=True), models.OrderBy(models.F('property'), descending=True), name='search_doc_price_sqft_desc'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:08
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    User = apps.get_model('DBComm', 'User')
+    Property = apps.get_model('DBComm', 'Property')
+    ReviewRating = apps.get_model('DBComm', 'ReviewRating')
+    PropertySearchDocument = apps.get_model('DBComm', 'PropertySearchDocument')
+
+    reviews = ReviewRating.objects.filter(property=OuterRef('pk')).order_by().values('property')
+    Property.objects.update(
+        rating_count=Coalesce(Subquery(reviews.annotate(total=Count('pk')).values('total')), 0),
+        rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0)
+    )
+
+    owned = Property.objects.filter(owner=OuterRef('pk')).order_by().values('owner')
+    User.objects.update(
+        rating_count=Coalesce(Subquery(owned.annotate(total=Sum('rating_count')).values('total')), 0),
+        rating_sum=Coalesce(Subquery(owned.annotate(total=Sum('rating_sum')).values('total')), 0)
+    )
+
+    average = ExpressionWrapper(
+        Cast('rating_sum', DecimalField(max_digits=12, decimal_places=2)) / F('rating_count'),
+        output_field=DecimalField(max_digits=3, decimal_places=2)
+    )
+    PropertySearchDocument.objects.update(
+        average_rating=Subquery(
+            Property.objects.filter(pk=OuterRef('pk'), rating_count__gt=0).annotate(
+                average=average
+            ).values('average')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DBComm', '0010_search_document_sort_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='propertysearchdocument',
+            name='average_rating',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=models.Index(fields=['average_rating', 'property'], name='property_se_average_3aedc9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertysearchdocument',
+            index=models.Index(models.OrderBy(models.F('average_rating'), descending=True, nulls_last=True), models.OrderBy(models.F('property'), descending=True), name='search_doc_rating_desc'),
+        ),
+    ]
@@ -1,9 +1,13 @@
 # models.py - Apartment Rental Django Models (FIXED)
 
-from django.db import models
+from django.db import models, router
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db.models import JSONField  # FIXED: Updated import
+from django.db.models.functions import Upper
 from django.utils import timezone
 
 
@@ -16,6 +20,33 @@ class BaseModel(models.Model):
         abstract = True
 
 
+class CounterFieldsMixin:
+    """
+    For models with counter columns maintained by F() updates: saving an existing
+    instance writes every other field, so stale in-memory counters are never written back.
+    Saves that force an INSERT or UPDATE, or name their own update_fields, are left alone,
+    and an instance whose row has been deleted is inserted again, as Model.save() does.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            self._state.adding or args or kwargs.get('update_fields') is not None
+            or kwargs.get('force_insert') or kwargs.get('force_update')
+        ):
+            return super().save(*args, **kwargs)
+
+        excluded = set(self.counter_fields) | self.get_deferred_fields()
+        update_fields = [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in excluded and field.attname not in excluded
+        ]
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        if not type(self)._base_manager.using(using).filter(pk=self.pk).exists():
+            return super().save(*args, **kwargs)
+        return super().save(*args, update_fields=update_fields, **kwargs)
+
+
 class Address(BaseModel):
     """Address information for properties"""
     street_address = models.CharField(max_length=255)
@@ -69,12 +100,21 @@ class Locality(BaseModel):
         db_table = 'localities'
         verbose_name = 'Locality'
         verbose_name_plural = 'Localities'
+        constraints = [
+            models.UniqueConstraint(fields=['locality_name', 'city', 'state'], name='unique_locality_per_city')
+        ]
+        indexes = [
+            # Trigram indexes on UPPER() serve icontains/istartswith and fuzzy location matching
+            GinIndex(OpClass(Upper('locality_name'), name='gin_trgm_ops'), name='localities_name_trgm'),
+            GinIndex(OpClass(Upper('city'), name='gin_trgm_ops'), name='localities_city_trgm'),
+            GinIndex(OpClass(Upper('state'), name='gin_trgm_ops'), name='localities_state_trgm'),
+        ]
 
     def __str__(self):
         return f"{self.locality_name}, {self.city}"
 
 
-class User(AbstractUser, BaseModel):
+class User(CounterFieldsMixin, AbstractUser, BaseModel):
     """Extended User model with apartment rental specific fields"""
     USER_TYPE_CHOICES = [
         ('owner', 'Owner'),
@@ -104,12 +144,24 @@ class User(AbstractUser, BaseModel):
     verification_token = models.CharField(max_length=255, blank=True, null=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
 
+    # Rollup of the review aggregates of every property this user owns
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    counter_fields = ('rating_count', 'rating_sum')
+
     class Meta:
         db_table = 'users'
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.user_type})"
 
+    @property
+    def average_rating(self):
+        """Average rating across the owner's properties"""
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 1)
+
 
 class UserPreference(BaseModel):
     """User search and notification preferences"""
@@ -176,7 +228,7 @@ class Amenity(BaseModel):
         return self.amenity_name
 
 
-class Property(BaseModel):
+class Property(CounterFieldsMixin, BaseModel):
     """Main property model"""
     CONSTRUCTION_STATUS_CHOICES = [
         ('ready_to_move', 'Ready to Move'),
@@ -257,6 +309,11 @@ class Property(BaseModel):
     available_from = models.DateField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
 
+    # Review aggregates, maintained incrementally by the ReviewRating signals
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    counter_fields = ('rating_count', 'rating_sum')
+
     class Meta:
         db_table = 'properties'
         verbose_name = 'Property'
@@ -276,6 +333,13 @@ class Property(BaseModel):
         """Get the primary image for this property"""
         return self.images.filter(is_primary=True).first()
 
+    @property
+    def average_rating(self):
+        """Average review rating, rounded to one decimal"""
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 1)
+
 
 class PropertyAmenity(BaseModel):
     """Junction table for Property and Amenity many-to-many relationship"""
@@ -293,7 +357,7 @@ class PropertyAmenity(BaseModel):
         return f"{self.property.title} - {self.amenity.amenity_name}"
 
 
-class Listing(BaseModel):
+class Listing(CounterFieldsMixin, BaseModel):
     """Property listing with pricing information"""
     LISTING_TYPE_CHOICES = [
         ('rent', 'Rent'),
@@ -328,6 +392,7 @@ class Listing(BaseModel):
     # Analytics
     views_count = models.PositiveIntegerField(default=0)
     contact_count = models.PositiveIntegerField(default=0)
+    counter_fields = ('views_count', 'contact_count')  # incremented with F() updates only
 
     class Meta:
         db_table = 'listings'
@@ -414,7 +479,9 @@ class PropertyInquiry(BaseModel):
         verbose_name_plural = 'Property Inquiries'
         indexes = [
             models.Index(fields=['property', 'inquirer']),
-            models.Index(fields=['inquirer', 'inquiry_date']),
+            # Keyset pagination on (-inquiry_date, id) for tenants and per property
+            models.Index(fields=['inquirer', '-inquiry_date', '-id']),
+            models.Index(fields=['property', '-inquiry_date', '-id']),
         ]
 
     def __str__(self):
@@ -481,6 +548,7 @@ class UserSearch(BaseModel):
         verbose_name_plural = 'User Searches'
         indexes = [
             models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['created_at']),
         ]
         constraints = [
             models.CheckConstraint(
@@ -509,7 +577,7 @@ class ReviewRating(BaseModel):
         verbose_name = 'Review & Rating'
         verbose_name_plural = 'Reviews & Ratings'
         indexes = [
-            models.Index(fields=['property']),
+            models.Index(fields=['property', '-created_at', '-id']),
             models.Index(fields=['reviewer']),
         ]
 
@@ -582,4 +650,155 @@ class NearbyPlace(BaseModel):
         ]
 
     def __str__(self):
-        return f"{self.place_name} ({self.place_type}) near {self.property.title}"
\ No newline at end of file
+        return f"{self.place_name} ({self.place_type}) near {self.property.title}"
+
+class PropertySearchDocument(models.Model):
+    """Flattened read model for property search - one row per active property with an active listing"""
+    property = models.OneToOneField(
+        Property,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='search_documents')
+
+    # Property details
+    title = models.CharField(max_length=200)
+    property_type = models.ForeignKey(PropertyType, on_delete=models.CASCADE, related_name='search_documents')
+    property_type_name = models.CharField(max_length=50)
+    furnishing = models.ForeignKey(
+        FurnishingType,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='search_documents'
+    )
+    furnishing_type_name = models.CharField(max_length=50, blank=True, null=True)
+    bedrooms = models.PositiveIntegerField()
+    bathrooms = models.PositiveIntegerField()
+    total_area_sqft = models.PositiveIntegerField(blank=True, null=True)
+    preferred_tenant = models.CharField(max_length=20, blank=True, null=True)
+    parking_available = models.BooleanField(default=False)
+    available_from = models.DateField(blank=True, null=True)
+
+    # Active listing
+    monthly_rent = models.DecimalField(max_digits=10, decimal_places=2)
+    security_deposit = models.DecimalField(max_digits=10, decimal_places=2)
+    negotiable = models.BooleanField(default=True)
+    immediately_available = models.BooleanField(default=True)
+
+    # Sort keys
+    price_per_sqft = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    views_count = models.PositiveIntegerField(default=0)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True)
+
+    # Location
+    locality_record = models.ForeignKey(
+        Locality,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='search_documents'
+    )
+    street_address = models.CharField(max_length=255)
+    locality = models.CharField(max_length=100)
+    city = models.CharField(max_length=100)
+    state = models.CharField(max_length=100)
+    latitude = models.DecimalField(max_digits=10, decimal_places=8, blank=True, null=True)
+    longitude = models.DecimalField(max_digits=11, decimal_places=8, blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, null=True)
+
+    # Amenities and media
+    amenity_ids = ArrayField(models.BigIntegerField(), default=list, blank=True)
+    primary_image_url = models.CharField(max_length=255, blank=True, null=True)
+
+    # Weighted full-text vector over title, location and description
+    search_vector = SearchVectorField(blank=True, null=True)
+
+    # Copied from the property so ordering never needs a join
+    created_at = models.DateTimeField()
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'property_search_documents'
+        verbose_name = 'Property Search Document'
+        verbose_name_plural = 'Property Search Documents'
+        indexes = [
+            models.Index(fields=['-created_at', '-property']),
+            # Sort keys, each with the primary key tie-breaker the ordering filter appends
+            models.Index(fields=['monthly_rent', 'property']),
+            models.Index(fields=['views_count', 'property']),
+            models.Index(fields=['price_per_sqft', 'property']),
+            # Descending price per sqft still lists properties without an area last
+            models.Index(
+                models.F('price_per_sqft').desc(nulls_last=True), models.F('property').desc(),
+                name='search_doc_price_sqft_desc'
+            ),
+            models.Index(fields=['average_rating', 'property']),
+            # Best rated first, unrated properties last
+            models.Index(
+                models.F('average_rating').desc(nulls_last=True), models.F('property').desc(),
+                name='search_doc_rating_desc'
+            ),
+            models.Index(fields=['city', 'monthly_rent']),
+            models.Index(fields=['locality']),
+            models.Index(fields=['bedrooms', 'monthly_rent']),
+            models.Index(fields=['property_type', 'monthly_rent']),
+            GinIndex(fields=['search_vector'], name='search_doc_vector_gin'),
+            # "Has all of these amenities" is a single amenity_ids @> ARRAY[...] check
+            GinIndex(fields=['amenity_ids'], name='search_doc_amenities_gin'),
+            GinIndex(OpClass(Upper('street_address'), name='gin_trgm_ops'), name='search_doc_street_trgm'),
+            # Prefix scans for geohash cell covers (radius and viewport search)
+            models.Index(fields=['geohash'], opclasses=['varchar_pattern_ops'], name='search_doc_geohash'),
+            # Incremental refreshes of the in-memory feature matrix
+            models.Index(fields=['indexed_at']),
+        ]
+
+    def __str__(self):
+        return f"Search document for {self.title}"
+
+
+class NotificationOutbox(BaseModel):
+    """Pending user notifications, written transactionally and delivered by a separate sender"""
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+        ('push', 'Push'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='notifications')
+    user_search = models.ForeignKey(
+        UserSearch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='notifications'
+    )
+    payload = JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'notification_outbox'
+        verbose_name = 'Notification'
+        verbose_name_plural = 'Notification Outbox'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', '-created_at']),
+        ]
+        constraints = [
+            # A listing is announced to a user at most once per channel
+            models.UniqueConstraint(fields=['user', 'listing', 'channel'], name='unique_notification_per_listing'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} notification for {self.user.username} ({self.status})"
@@ -0,0 +1,251 @@
+# pagination.py - Pagination classes for list endpoints
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator as DjangoPaginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError as RequestValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+def planner_row_estimate(queryset):
+    """Number of rows the PostgreSQL planner expects a queryset to return, or None"""
+    try:
+        plan = json.loads(queryset.explain(format='json'))
+        if isinstance(plan, list):
+            plan = plan[0]
+        return int(plan['Plan']['Plan Rows'])
+    except (DatabaseError, ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+class EstimatedCountPage(Page):
+    """Page that knows from its own rows whether another page follows"""
+
+    def __init__(self, object_list, number, paginator, more_rows):
+        super().__init__(object_list, number, paginator)
+        self.more_rows = more_rows
+
+    def has_next(self):
+        return self.more_rows
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """
+    Paginator whose total is exact up to `exact_count_limit` rows and the planner's
+    estimate above it, so large result sets never pay for a full COUNT(*).
+
+    The estimate is only reported: pages are validated by fetching one row past the
+    page, so a deep page exists whenever it has rows, whatever the planner guessed.
+    """
+    exact_count_limit = 1000
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return len(queryset)
+
+        queryset = queryset.order_by()
+        capped = queryset.values('pk')[:self.exact_count_limit + 1].count()
+        if capped <= self.exact_count_limit:
+            return capped
+
+        self.count_is_estimate = True
+        return max(planner_row_estimate(queryset) or 0, capped)
+
+    def validate_number(self, number):
+        """Paginator.validate_number without the upper bound, which would come from the count"""
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + self.orphans + 1])
+
+        # As in Paginator, up to `orphans` trailing rows are folded into the last page
+        more_rows = len(rows) > self.per_page + self.orphans
+        if more_rows:
+            rows = rows[:self.per_page]
+        if not rows and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage(self.error_messages['no_results'])
+        return EstimatedCountPage(rows, number, self, more_rows)
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (cursor) mode.
+
+    In page-number mode `count` is exact up to EstimatedCountPaginator.exact_count_limit
+    and an estimate above it (flagged by `count_is_estimate`).
+
+    Sending ?cursor= (empty for the first page) switches to keyset mode: rows are
+    ordered by the requested sort (or `keyset`, see get_keyset) and every page
+    starts strictly after the last row of the previous one, so no COUNT(*) or
+    OFFSET is issued and deep pages cost the same as the first. Sorts a cursor
+    cannot encode (relevance, distance, nullable keys) are rejected with a 400.
+    Cursor tokens are opaque; clients should only follow the `next` and
+    `previous` links.
+    """
+    django_paginator_class = EstimatedCountPaginator
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    keyset = ('-created_at', '-pk')
+    invalid_cursor_message = 'Invalid cursor'
+    unsupported_ordering_message = 'Cursor pagination is not available for this ordering'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.keyset = self.get_keyset(queryset)
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request.query_params[self.cursor_query_param], queryset.model)
+
+        ordering = self.get_ordering(reverse)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_condition(ordering, position))
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Going backwards we always came from a later page; going forwards from
+        # a position we always came from an earlier one.
+        has_next = (has_more if not reverse else True) and bool(rows)
+        has_previous = (position is not None if not reverse else has_more) and bool(rows)
+
+        self.next_cursor = self.encode_cursor(rows[-1], reverse=False) if has_next else None
+        self.previous_cursor = self.encode_cursor(rows[0], reverse=True) if has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return Response({
+                'count': self.page.paginator.count,
+                'count_is_estimate': self.page.paginator.count_is_estimate,
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+            })
+        return Response({
+            'next': self.get_cursor_link(self.next_cursor),
+            'previous': self.get_cursor_link(self.previous_cursor),
+            'results': data,
+        })
+
+    def get_keyset(self, queryset):
+        """
+        The queryset's own ordering when it is on non-null model fields (ending in a unique
+        key), or the default `keyset` when it has none. Any other ordering is rejected
+        rather than silently replaced, so pages never lose the order the client asked for.
+        """
+        ordering = list(queryset.query.order_by)
+        if not ordering:
+            return self.keyset
+        if not all(isinstance(term, str) for term in ordering):
+            raise self.unsupported_ordering()
+
+        keyset = []
+        for term in ordering:
+            descending, name = term.startswith('-'), term.lstrip('-')
+            if name == queryset.model._meta.pk.name:
+                name = 'pk'
+            if name != 'pk':
+                try:
+                    field = queryset.model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    raise self.unsupported_ordering()
+                if not field.concrete or field.is_relation or field.null:
+                    raise self.unsupported_ordering()
+            keyset.append(f'-{name}' if descending else name)
+
+        if keyset[-1].lstrip('-') != 'pk':
+            keyset.append('-pk' if keyset[-1].startswith('-') else 'pk')
+        return tuple(keyset)
+
+    def unsupported_ordering(self):
+        return RequestValidationError({self.cursor_query_param: [self.unsupported_ordering_message]})
+
+    def get_ordering(self, reverse=False):
+        if not reverse:
+            return list(self.keyset)
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.keyset]
+
+    def get_keyset_condition(self, ordering, position):
+        """Rows strictly after `position` in `ordering`, expanded as (a < x) OR (a = x AND b < y) ..."""
+        condition = Q()
+        for index, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            branch = Q(**{f'{field.lstrip("-")}__{lookup}': position[index]})
+            for earlier_index, earlier_field in enumerate(ordering[:index]):
+                branch &= Q(**{earlier_field.lstrip('-'): position[earlier_index]})
+            condition |= branch
+        return condition
+
+    def get_keyset_values(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.keyset]
+
+    def encode_cursor(self, obj, reverse):
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in self.get_keyset_values(obj)
+        ]
+        # Decimal sort keys are written as strings; decode_cursor's to_python restores them
+        payload = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'), cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, token, model):
+        """Return (position, reverse) for a cursor token; position is None for the first page"""
+        if not token:
+            return None, False
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = payload['p']
+            if len(values) != len(self.keyset):
+                raise ValueError
+            position = [
+                self.get_model_field(model, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.keyset, values)
+            ]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_model_field(self, model, name):
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+
+class InquiryPagination(KeysetPagination):
+    """Keyset pagination for inquiry lists, newest inquiry first"""
+    keyset = ('-inquiry_date', '-pk')
@@ -0,0 +1,207 @@
+# readers.py - Lean read path for property list payloads
+
+from functools import lru_cache
+from types import SimpleNamespace
+
+from django.db.models.fields.files import FieldFile
+from rest_framework.relations import RelatedField
+from rest_framework.serializers import FileField as FileSerializerField
+from .models import User, Address, Property, PropertyImage, Listing, SavedProperty
+from .serializers import AddressSerializer, PropertyListSerializer, PropertyImageSerializer, SavedPropertySerializer
+from .fieldsets import FULL_FIELDSET
+
+# Returned by an extractor when DRF would leave the key out (SkipField)
+SKIP = object()
+
+
+def _field_converter(serializer_field, model):
+    """The to_representation a DRF field applies to a .values() value"""
+    if isinstance(serializer_field, RelatedField):
+        return lambda value: value  # .values() already holds the primary key
+
+    if isinstance(serializer_field, FileSerializerField):
+        model_field = model._meta.get_field(serializer_field.source)
+        return lambda value: serializer_field.to_representation(FieldFile(None, model_field, value))
+
+    return serializer_field.to_representation
+
+
+def compile_fields(serializer, model, prefix='', handlers=None):
+    """
+    [(key, extractor)] reproducing `serializer.to_representation` for a .values() row
+    whose columns are named `prefix` + source path (joined with __). `handlers` supplies
+    extractors for keys that are not plain model fields.
+    """
+    handlers = handlers or {}
+    compiled = []
+
+    for key, serializer_field in serializer.fields.items():
+        if serializer_field.write_only:
+            continue
+        if key in handlers:
+            compiled.append((key, handlers[key]))
+            continue
+
+        column = prefix + '__'.join(serializer_field.source_attrs)
+        convert = _field_converter(serializer_field, model)
+
+        # A source through a relation is skipped by DRF when the relation is empty
+        relation = prefix + serializer_field.source_attrs[0] if len(serializer_field.source_attrs) > 1 else None
+
+        def extract(row, column=column, convert=convert, relation=relation):
+            if relation is not None and row[relation] is None:
+                return SKIP
+            value = row[column]
+            return None if value is None else convert(value)
+
+        compiled.append((key, extract))
+    return compiled
+
+
+def value_columns(serializer, prefix='', skip=()):
+    """.values() columns compile_fields() reads for `serializer`, excluding keys in `skip`"""
+    columns = []
+    for key, serializer_field in serializer.fields.items():
+        if serializer_field.write_only or key in skip:
+            continue
+        source_attrs = serializer_field.source_attrs
+        if len(source_attrs) > 1:
+            columns.append(prefix + source_attrs[0])
+        columns.append(prefix + '__'.join(source_attrs))
+    return columns
+
+
+def build(compiled, row):
+    item = {}
+    for key, extract in compiled:
+        value = extract(row)
+        if value is not SKIP:
+            item[key] = value
+    return item
+
+
+class PropertyListReader:
+    """
+    Produces exactly what PropertyListSerializer(many=True).data does for a list of
+    property IDs, from .values() queries and field extractors compiled once, instead
+    of model instances walked by DRF's per-row field machinery. Compiled for one
+    fieldset: columns and queries for keys that were not requested are left out.
+    """
+
+    def __init__(self, fieldset=FULL_FIELDSET):
+        serializer = PropertyListSerializer(context={'fieldset': fieldset})
+        fields = serializer.fields
+        handlers = {
+            'owner_name': self.owner_name,
+            'primary_image': lambda row: row['_primary_image'],
+            'current_listing': lambda row: row['_current_listing'],
+            'average_rating': self.average_rating,
+        }
+
+        self.property_columns = []
+        if 'owner_name' in fields:
+            self.property_columns += ['owner', 'owner__first_name', 'owner__last_name']
+        if 'average_rating' in fields:
+            self.property_columns += ['rating_sum', 'rating_count']
+        if isinstance(fields.get('address'), AddressSerializer):
+            address_fields = compile_fields(fields['address'], Address, prefix='address__')
+            handlers['address'] = lambda row: build(address_fields, row)
+            self.property_columns += value_columns(fields['address'], prefix='address__')
+        self.property_columns += value_columns(serializer, skip=handlers)
+
+        self.reads_images = 'primary_image' in fields
+        self.reads_listings = 'current_listing' in fields
+        image_serializer = PropertyImageSerializer()
+        self.image_columns = ['property_id', *value_columns(image_serializer)]
+        self.image_fields = compile_fields(image_serializer, PropertyImage)
+        self.property_fields = compile_fields(serializer, Property, handlers=handlers)
+
+    @staticmethod
+    def owner_name(row):
+        if row['owner'] is None:
+            return SKIP
+        return User.get_full_name(SimpleNamespace(first_name=row['owner__first_name'], last_name=row['owner__last_name']))
+
+    @staticmethod
+    def average_rating(row):
+        return Property.average_rating.fget(SimpleNamespace(rating_count=row['rating_count'], rating_sum=row['rating_sum']))
+
+    def read(self, property_ids):
+        """Serialized properties in the order of property_ids (missing IDs are dropped)"""
+        property_ids = list(property_ids)
+        if not property_ids:
+            return []
+
+        rows = {
+            row['id']: row
+            for row in Property.objects.filter(pk__in=property_ids).values(*self.property_columns)
+        }
+
+        # First primary image (model ordering) and current listing, as PropertyListSerializer picks them
+        primary_images = {}
+        if self.reads_images:
+            images = PropertyImage.objects.filter(property_id__in=rows, is_primary=True).values(*self.image_columns)
+            for image in images:
+                primary_images.setdefault(image['property_id'], image)
+
+        current_listings = {}
+        if self.reads_listings:
+            listings = Listing.objects.filter(property_id__in=rows, listing_status='active').order_by(
+                '-listing_date', '-id'
+            ).values('id', 'property_id', 'monthly_rent', 'security_deposit', 'negotiable')
+            for listing in listings:
+                current_listings.setdefault(listing.pop('property_id'), listing)
+
+        results = []
+        for pk in property_ids:
+            row = rows.get(pk)
+            if row is None:
+                continue
+            image = primary_images.get(pk)
+            row['_primary_image'] = build(self.image_fields, image) if image else None
+            row['_current_listing'] = current_listings.get(pk)
+            results.append(build(self.property_fields, row))
+        return results
+
+
+class SavedPropertyReader:
+    """Lean equivalent of SavedPropertySerializer(many=True).data"""
+
+    def __init__(self, property_reader):
+        self.property_reader = property_reader
+        serializer = SavedPropertySerializer()
+        self.columns = ['property', *value_columns(serializer, skip=('property',))]
+        self.fields = compile_fields(serializer, SavedProperty, handlers={
+            'property': lambda row: row['_property'],
+        })
+
+    def read(self, saved_property_ids):
+        saved_property_ids = list(saved_property_ids)
+        rows = {
+            row['id']: row
+            for row in SavedProperty.objects.filter(pk__in=saved_property_ids).values(*self.columns)
+        }
+        properties = {
+            item['id']: item
+            for item in self.property_reader.read(row['property'] for row in rows.values())
+        }
+
+        results = []
+        for pk in saved_property_ids:
+            row = rows.get(pk)
+            if row is None:
+                continue
+            row['_property'] = properties.get(row['property'])
+            results.append(build(self.fields, row))
+        return results
+
+
+@lru_cache(maxsize=64)
+def property_list_reader(fieldset=FULL_FIELDSET):
+    """Shared PropertyListReader for a fieldset, compiled on first use"""
+    return PropertyListReader(fieldset)
+
+
+@lru_cache(maxsize=1)
+def saved_property_reader():
+    return SavedPropertyReader(property_list_reader())
@@ -0,0 +1,154 @@
+# recommendations.py - Personalized property ranking from preferences and search history
+
+import time
+from collections import Counter
+
+import numpy as np
+from .models import Amenity, Property, PropertyType, UserPreference
+from .features import property_features
+
+RECOMMENDATION_CACHE_TIMEOUT = 300  # seconds
+RECENT_SEARCH_LIMIT = 20
+
+# Relative weight of each signal in the final score
+SCORE_WEIGHTS = {
+    'budget': 3.0,
+    'location': 3.0,
+    'property_type': 1.5,
+    'bedrooms': 1.5,
+    'furnishing': 0.5,
+    'amenities': 1.0,
+    'freshness': 0.5,
+}
+# Share of the budget a rent may fall outside it before the budget score reaches zero
+BUDGET_TOLERANCE = 0.25
+FRESHNESS_HALF_LIFE_DAYS = 14
+
+
+def _resolve_ids(values, ids_by_name):
+    """Preference lists may hold IDs or names; map both to IDs"""
+    resolved = set()
+    for value in values or []:
+        if isinstance(value, int):
+            resolved.add(value)
+        elif isinstance(value, str):
+            if value.strip().isdigit():
+                resolved.add(int(value))
+            elif value.strip().lower() in ids_by_name:
+                resolved.add(ids_by_name[value.strip().lower()])
+    return resolved
+
+
+def _median(values):
+    values = [float(value) for value in values if value]
+    return float(np.median(values)) if values else None
+
+
+def user_profile(user):
+    """Ranking signals for a user from UserPreference and their recent searches"""
+    preference = UserPreference.objects.filter(user=user).first()
+    searches = list(user.searches.order_by('-created_at').values(
+        'location', 'min_rent', 'max_rent', 'bedrooms', 'property_type_id', 'furnishing_id', 'search_query'
+    )[:RECENT_SEARCH_LIMIT])
+
+    type_ids = {name.lower(): pk for pk, name in PropertyType.objects.values_list('pk', 'type_name')}
+    amenity_ids = {name.lower(): pk for pk, name in Amenity.objects.values_list('pk', 'amenity_name')}
+
+    budget_min = preference.budget_min if preference else None
+    budget_max = preference.budget_max if preference else None
+    locations = [
+        value.strip().lower() for value in (preference.preferred_locations if preference else [])
+        if isinstance(value, str) and value.strip()
+    ]
+    property_types = _resolve_ids(preference.preferred_property_types if preference else [], type_ids)
+    amenities = _resolve_ids(preference.preferred_amenities if preference else [], amenity_ids)
+
+    for search in searches:
+        if search['location']:
+            locations.append(search['location'].strip().lower())
+        if search['property_type_id']:
+            property_types.add(search['property_type_id'])
+        query = search['search_query'] if isinstance(search['search_query'], dict) else {}
+        amenities |= _resolve_ids(query.get('amenities'), amenity_ids)
+
+    return {
+        # Searches fill in a budget the user never set
+        'budget_min': float(budget_min) if budget_min else _median(s['min_rent'] for s in searches),
+        'budget_max': float(budget_max) if budget_max else _median(s['max_rent'] for s in searches),
+        'locations': set(locations),
+        'property_types': property_types,
+        'amenities': amenities,
+        'bedrooms': Counter(s['bedrooms'] for s in searches if s['bedrooms']),
+        'furnishing': Counter(s['furnishing_id'] for s in searches if s['furnishing_id']),
+    }
+
+
+def _frequency_score(values, counts):
+    """Share of the user's searches that asked for each row's value"""
+    score = np.zeros(len(values))
+    total = sum(counts.values())
+    for value, count in counts.items():
+        score[values == value] = count / total
+    return score
+
+
+def score_properties(snapshot, profile):
+    """Score every row of a feature snapshot for a user profile in one vectorized pass"""
+    columns = snapshot.columns
+    rent = columns['rent']
+    scores = np.zeros(len(snapshot.ids))
+
+    low, high = profile['budget_min'], profile['budget_max']
+    if low or high:
+        overshoot = np.zeros(len(rent))
+        if low:
+            overshoot = np.maximum(overshoot, (low - rent) / (low * BUDGET_TOLERANCE))
+        if high:
+            overshoot = np.maximum(overshoot, (rent - high) / (high * BUDGET_TOLERANCE))
+        scores += SCORE_WEIGHTS['budget'] * np.clip(1 - overshoot, 0, 1)
+
+    if profile['locations']:
+        # Same substring semantics as the search location filter
+        codes = [
+            code for name, code in snapshot.places.items()
+            if any(location in name for location in profile['locations'])
+        ]
+        in_location = np.isin(columns['city'], codes) | np.isin(columns['locality'], codes)
+        scores += SCORE_WEIGHTS['location'] * in_location
+
+    if profile['property_types']:
+        scores += SCORE_WEIGHTS['property_type'] * np.isin(columns['property_type'], list(profile['property_types']))
+
+    if profile['bedrooms']:
+        scores += SCORE_WEIGHTS['bedrooms'] * _frequency_score(columns['bedrooms'], profile['bedrooms'])
+
+    if profile['furnishing']:
+        scores += SCORE_WEIGHTS['furnishing'] * _frequency_score(columns['furnishing'], profile['furnishing'])
+
+    amenity_columns = [snapshot.amenity_columns[pk] for pk in profile['amenities'] if pk in snapshot.amenity_columns]
+    if profile['amenities']:
+        matched = columns['amenities'][:, amenity_columns].sum(axis=1) if amenity_columns else 0
+        scores += SCORE_WEIGHTS['amenities'] * matched / len(profile['amenities'])
+
+    age_days = (time.time() - columns['created']) / 86400
+    scores += SCORE_WEIGHTS['freshness'] * np.power(0.5, np.maximum(age_days, 0) / FRESHNESS_HALF_LIFE_DAYS)
+
+    scores[~snapshot.alive] = -np.inf
+    return scores
+
+
+def recommend_properties(user, limit):
+    """[(property_id, score)] of the best matching active properties, best first"""
+    snapshot = property_features.get()
+    if not len(snapshot.ids):
+        return []
+
+    scores = score_properties(snapshot, user_profile(user))
+    scores[np.isin(snapshot.ids, list(Property.objects.filter(owner=user).values_list('pk', flat=True)))] = -np.inf
+
+    limit = min(limit, int(np.isfinite(scores).sum()))
+    if limit <= 0:
+        return []
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [(int(snapshot.ids[row]), round(float(scores[row]), 4)) for row in top]
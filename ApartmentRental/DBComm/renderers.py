@@ -0,0 +1,36 @@
+# renderers.py - JSON renderer backed by orjson
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stock encoder is used instead
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renders with orjson's C encoder, producing the same JSON as the compact JSONRenderer.
+    Types orjson does not share DRF's representation of (Decimal as a float, UTC
+    datetimes with a Z suffix, lazy strings, querysets) go through DRF's own encoder.
+    The bytes match too, except for floats: exponents are written without a sign or
+    padding (1e16, not 1e+16), and NaN and infinity become null where JSONRenderer
+    raises. Falls back to JSONRenderer when orjson is not installed or the output has
+    to be indented or ASCII-only.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def __init__(self):
+        super().__init__()
+        self.fallback_encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        ret = orjson.dumps(data, default=self.fallback_encoder.default, option=self.options)
+        # Escaped by JSONRenderer too: valid JSON, but line terminators in JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
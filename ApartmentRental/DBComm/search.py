@@ -0,0 +1,307 @@
+# search.py - Denormalized search documents for the property list and search endpoints
+
+import threading
+from decimal import Decimal
+
+from django.contrib.postgres.search import SearchVector
+from django.db import transaction
+from django.db.models import Prefetch, OuterRef, Subquery, Q
+from django.dispatch import Signal
+from .models import Property, Listing, PropertyImage, PropertySearchDocument, Locality
+from .geo import encode_geohash
+from .caching import bump_city_versions, bump_versions, ALL_CITIES, LOCALITY_SET
+
+SEARCH_DOCUMENT_BATCH_SIZE = 500
+
+# Text search configuration shared by the stored vectors and incoming queries
+SEARCH_CONFIG = 'english'
+
+# Columns rewritten when an existing search document is upserted
+SEARCH_DOCUMENT_UPDATE_FIELDS = [
+    field.name for field in PropertySearchDocument._meta.concrete_fields
+    if not field.primary_key and field.name != 'search_vector'
+]
+
+_pending = threading.local()
+
+# Sent after a refresh with the documents whose active listing is new (newly searchable
+# properties and properties whose active listing was replaced)
+search_document_listed = Signal()
+
+
+def locality_key(address):
+    """Key identifying the Locality row an address belongs to"""
+    return (address.locality.strip(), address.city.strip(), address.state.strip())
+
+
+def resolve_localities(addresses):
+    """Map locality keys to Locality IDs, creating rows for localities not seen before"""
+    addresses = list(addresses)
+    keys = {locality_key(address) for address in addresses}
+    if not keys:
+        return {}
+
+    def lookup():
+        localities = Locality.objects.filter(
+            locality_name__in={key[0] for key in keys},
+            city__in={key[1] for key in keys},
+        ).values_list('id', 'locality_name', 'city', 'state')
+        return {(name, city, state): pk for pk, name, city, state in localities}
+
+    locality_ids = lookup()
+    missing = keys - locality_ids.keys()
+    if missing:
+        pincodes = {locality_key(address): address.pincode for address in addresses}
+        Locality.objects.bulk_create(
+            [Locality(locality_name=name, city=city, state=state, pincode=pincodes[(name, city, state)])
+             for name, city, state in missing],
+            ignore_conflicts=True
+        )
+        # A new locality can widen what a cached location search matches
+        bump_versions([LOCALITY_SET])
+        locality_ids = lookup()
+    return locality_ids
+
+
+def matching_localities(value, include_state=True):
+    """Localities whose name, city (or state) contains value - served by the trigram indexes"""
+    condition = Q(locality_name__icontains=value) | Q(city__icontains=value)
+    if include_state:
+        condition |= Q(state__icontains=value)
+    return Locality.objects.filter(condition)
+
+
+def search_documents(filters):
+    """Search documents matching validated PropertySearchSerializer data"""
+    queryset = PropertySearchDocument.objects.all()
+
+    if filters.get('location'):
+        queryset = queryset.filter(locality_record__in=matching_localities(filters['location']))
+
+    if filters.get('property_type'):
+        queryset = queryset.filter(property_type_id=filters['property_type'])
+
+    if filters.get('furnishing'):
+        queryset = queryset.filter(furnishing_id=filters['furnishing'])
+
+    if filters.get('bedrooms'):
+        queryset = queryset.filter(bedrooms=filters['bedrooms'])
+
+    if filters.get('bathrooms'):
+        queryset = queryset.filter(bathrooms__gte=filters['bathrooms'])
+
+    if filters.get('min_area'):
+        queryset = queryset.filter(total_area_sqft__gte=filters['min_area'])
+
+    if filters.get('max_area'):
+        queryset = queryset.filter(total_area_sqft__lte=filters['max_area'])
+
+    if filters.get('preferred_tenant'):
+        queryset = queryset.filter(
+            Q(preferred_tenant=filters['preferred_tenant']) |
+            Q(preferred_tenant='any')
+        )
+
+    if filters.get('parking_required'):
+        queryset = queryset.filter(parking_available=True)
+
+    if filters.get('available_from'):
+        queryset = queryset.filter(available_from__lte=filters['available_from'])
+
+    # Filter by rent range
+    if filters.get('min_rent'):
+        queryset = queryset.filter(monthly_rent__gte=filters['min_rent'])
+
+    if filters.get('max_rent'):
+        queryset = queryset.filter(monthly_rent__lte=filters['max_rent'])
+
+    # Filter by amenities (property must have all of them)
+    if filters.get('amenities'):
+        queryset = queryset.filter(amenity_ids__contains=filters['amenities'])
+
+    return queryset
+
+
+def search_scopes(filters):
+    """Cache version scopes a search depends on: the cities its location can match, or all cities"""
+    if not filters.get('location'):
+        return [ALL_CITIES]
+    cities = matching_localities(filters['location']).values_list('city', flat=True).distinct()
+    return [LOCALITY_SET, *cities]
+
+
+def price_per_sqft(monthly_rent, total_area_sqft):
+    if not total_area_sqft:
+        return None
+    return (monthly_rent / total_area_sqft).quantize(Decimal('0.01'))
+
+
+def document_rating(rating_sum, rating_count):
+    if not rating_count:
+        return None
+    return (Decimal(rating_sum) / rating_count).quantize(Decimal('0.01'))
+
+
+def build_search_document(property_obj, locality_ids=None):
+    """Build an unsaved search document, or None if the property should not be searchable"""
+    if not property_obj.is_active or not property_obj.active_listings:
+        return None
+
+    listing = property_obj.active_listings[0]
+    address = property_obj.address
+    primary_image = property_obj.primary_images[0] if property_obj.primary_images else None
+    has_coordinates = address.latitude is not None and address.longitude is not None
+
+    return PropertySearchDocument(
+        property_id=property_obj.id,
+        listing_id=listing.id,
+        title=property_obj.title,
+        property_type_id=property_obj.property_type_id,
+        property_type_name=property_obj.property_type.type_name,
+        furnishing_id=property_obj.furnishing_id,
+        furnishing_type_name=property_obj.furnishing.furnishing_type if property_obj.furnishing else None,
+        bedrooms=property_obj.bedrooms,
+        bathrooms=property_obj.bathrooms,
+        total_area_sqft=property_obj.total_area_sqft,
+        preferred_tenant=property_obj.preferred_tenant,
+        parking_available=property_obj.parking_available,
+        available_from=property_obj.available_from,
+        monthly_rent=listing.monthly_rent,
+        security_deposit=listing.security_deposit,
+        negotiable=listing.negotiable,
+        immediately_available=listing.immediately_available,
+        price_per_sqft=price_per_sqft(listing.monthly_rent, property_obj.total_area_sqft),
+        views_count=listing.views_count,
+        average_rating=document_rating(property_obj.rating_sum, property_obj.rating_count),
+        locality_record_id=(locality_ids or {}).get(locality_key(address)),
+        street_address=address.street_address,
+        locality=address.locality,
+        city=address.city,
+        state=address.state,
+        latitude=address.latitude,
+        longitude=address.longitude,
+        geohash=encode_geohash(address.latitude, address.longitude) if has_coordinates else None,
+        amenity_ids=sorted(pa.amenity_id for pa in property_obj.property_amenities.all()),
+        primary_image_url=primary_image.image.url if primary_image and primary_image.image else None,
+        created_at=property_obj.created_at,
+    )
+
+
+def search_document_vector():
+    """Weighted tsvector over a search document's title and location plus its property's description"""
+    description = Subquery(
+        Property.objects.filter(pk=OuterRef('pk')).values('description')[:1]
+    )
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector('locality', 'city', weight='B', config=SEARCH_CONFIG) +
+        SearchVector(description, weight='C', config=SEARCH_CONFIG) +
+        SearchVector('street_address', 'state', weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_documents(property_ids, notify=True):
+    """
+    Rebuild the search documents for the given properties, dropping ones no longer searchable.
+    Pass notify=False for backfills and repairs, which must not announce existing listings
+    as newly listed through search_document_listed.
+    """
+    property_ids = list(set(property_ids))
+
+    for start in range(0, len(property_ids), SEARCH_DOCUMENT_BATCH_SIZE):
+        batch_ids = property_ids[start:start + SEARCH_DOCUMENT_BATCH_SIZE]
+        properties = Property.objects.filter(pk__in=batch_ids).select_related(
+            'property_type', 'furnishing', 'address'
+        ).prefetch_related(*property_list_prefetches(), 'property_amenities')
+
+        properties = list(properties)
+        locality_ids = resolve_localities(property_obj.address for property_obj in properties)
+        documents = [
+            doc for doc in (build_search_document(p, locality_ids) for p in properties)
+            if doc is not None
+        ]
+
+        existing = {
+            pk: (city, listing_id)
+            for pk, city, listing_id in PropertySearchDocument.objects.filter(
+                pk__in=batch_ids
+            ).values_list('pk', 'city', 'listing_id')
+        }
+        listed = [doc for doc in documents if existing.get(doc.pk, (None, None))[1] != doc.listing_id]
+
+        # Cached searches over both the old and the new city of each document go stale
+        affected_cities = {city for city, _ in existing.values()}
+        affected_cities.update(doc.city for doc in documents)
+
+        with transaction.atomic():
+            PropertySearchDocument.objects.filter(pk__in=batch_ids).exclude(
+                pk__in=[doc.pk for doc in documents]
+            ).delete()
+            if documents:
+                PropertySearchDocument.objects.bulk_create(
+                    documents,
+                    update_conflicts=True,
+                    unique_fields=['property'],
+                    update_fields=SEARCH_DOCUMENT_UPDATE_FIELDS,
+                )
+                PropertySearchDocument.objects.filter(
+                    pk__in=[doc.pk for doc in documents]
+                ).update(search_vector=search_document_vector())
+
+        bump_city_versions(affected_cities)
+        if notify and listed:
+            search_document_listed.send(sender=PropertySearchDocument, documents=listed)
+
+
+class _RefreshBatch:
+    """Property IDs collected during one transaction, refreshed once it commits"""
+
+    def __init__(self):
+        self.property_ids = set()
+
+    def __call__(self):
+        refresh_search_documents(self.property_ids)
+
+
+def schedule_search_document_refresh(property_ids):
+    """Refresh search documents after the current transaction commits (immediately in autocommit)"""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        refresh_search_documents(property_ids)
+        return
+
+    # Coalesce every change made inside one transaction into a single refresh
+    batch = getattr(_pending, 'batch', None)
+    if batch is None or not any(entry[1] is batch for entry in connection.run_on_commit):
+        batch = _pending.batch = _RefreshBatch()
+        transaction.on_commit(batch)
+    batch.property_ids.update(property_ids)
+
+
+def property_list_prefetches(prefix=''):
+    """
+    Prefetches PropertyListSerializer reads from: `primary_images` and `active_listings`
+    (current listing first, as on the search document). Pass prefix='property__' when
+    prefetching through a relation.
+    """
+    return [
+        Prefetch(
+            f'{prefix}images',
+            queryset=PropertyImage.objects.filter(is_primary=True),
+            to_attr='primary_images'
+        ),
+        Prefetch(
+            f'{prefix}listings',
+            queryset=Listing.objects.filter(listing_status='active').order_by('-listing_date', '-id'),
+            to_attr='active_listings'
+        ),
+    ]
+
+
+def load_properties(property_ids):
+    """Fetch full Property rows for a page of search results, preserving result order"""
+    property_ids = list(property_ids)
+    properties = Property.objects.select_related(
+        'property_type', 'furnishing', 'owner', 'address'
+    ).prefetch_related(*property_list_prefetches()).in_bulk(property_ids)
+    return [properties[pk] for pk in property_ids if pk in properties]
@@ -3,11 +3,49 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
 from .models import (
     User, UserPreference, Property, PropertyType, FurnishingType,
     Amenity, PropertyAmenity, Listing, PropertyImage, PropertyInquiry,
-    SavedProperty, UserSearch, ReviewRating, PropertyVisit, NearbyPlace, Address
+    SavedProperty, UserSearch, ReviewRating, PropertyVisit, NearbyPlace, Address, Locality
 )
+from .search import schedule_search_document_refresh
+from .fieldsets import FULL_FIELDSET
+
+# Listings one bulk listing update may change
+BULK_LISTING_MAX_ITEMS = 1000
+
+
+class FieldsetSerializerMixin:
+    """
+    Applies the `fieldset` from the serializer context (see fieldsets.py) before any
+    instance is serialized: keys that were not requested are removed, so their sources
+    and method fields never run, and `expandable_fields` that are not expanded become
+    a primary key (foreign keys) or are removed (collections and computed fields).
+    """
+    expandable_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fieldset = self.context.get('fieldset', FULL_FIELDSET)
+        if fieldset is FULL_FIELDSET:
+            return
+
+        for name in list(self.fields):
+            if not fieldset.includes(name):
+                del self.fields[name]
+            elif name in self.expandable_fields and not fieldset.expands(name):
+                if self._is_foreign_key(name):
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+                else:
+                    del self.fields[name]
+
+    def _is_foreign_key(self, name):
+        try:
+            return self.Meta.model._meta.get_field(name).many_to_one
+        except FieldDoesNotExist:
+            return False
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -63,9 +101,10 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'username', 'email', 'first_name', 'last_name',
             'phone_number', 'user_type', 'profile_picture',
-            'date_of_birth', 'gender', 'occupation', 'is_verified', 'status'
+            'date_of_birth', 'gender', 'occupation', 'is_verified', 'status',
+            'average_rating', 'rating_count'
         )
-        read_only_fields = ('id', 'username', 'is_verified', 'status')
+        read_only_fields = ('id', 'username', 'is_verified', 'status', 'rating_count')
 
 
 class AddressSerializer(serializers.ModelSerializer):
@@ -76,6 +115,14 @@ class AddressSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class LocalitySerializer(serializers.ModelSerializer):
+    """Serializer for location autocomplete suggestions"""
+
+    class Meta:
+        model = Locality
+        fields = ('id', 'locality_name', 'city', 'state', 'pincode')
+
+
 class PropertyTypeSerializer(serializers.ModelSerializer):
     """Serializer for property types"""
 
@@ -133,8 +180,29 @@ class ListingSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class PropertyListSerializer(serializers.ModelSerializer):
+class BulkListingChangeSerializer(serializers.Serializer):
+    """Changes the bulk listing endpoint applies to the listings in `ids`; at least one is required"""
+    ids = serializers.ListField(child=serializers.IntegerField(), max_length=BULK_LISTING_MAX_ITEMS)
+    listing_status = serializers.ChoiceField(choices=Listing.LISTING_STATUS_CHOICES, required=False)
+    monthly_rent = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    expiry_date = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        if not any(name in attrs for name in ('listing_status', 'monthly_rent', 'expiry_date')):
+            raise serializers.ValidationError('Provide listing_status, monthly_rent or expiry_date')
+        return attrs
+
+
+class BulkListingItemSerializer(BulkListingChangeSerializer):
+    """One listing's changes in a per-item bulk update"""
+    ids = None
+    id = serializers.IntegerField()
+
+
+class PropertyListSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Simplified serializer for property listings (list view)"""
+    expandable_fields = ('address', 'primary_image', 'current_listing')
+
     property_type_name = serializers.CharField(source='property_type.type_name', read_only=True)
     furnishing_type_name = serializers.CharField(source='furnishing.furnishing_type', read_only=True)
     owner_name = serializers.CharField(source='owner.get_full_name', read_only=True)
@@ -147,17 +215,26 @@ class PropertyListSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'title', 'property_type_name', 'furnishing_type_name',
             'bedrooms', 'bathrooms', 'total_area_sqft', 'address',
-            'owner_name', 'primary_image', 'current_listing', 'available_from'
+            'owner_name', 'primary_image', 'current_listing', 'available_from',
+            'average_rating', 'rating_count'
         )
 
+    # Both fields read the Prefetch(to_attr=...) results from search.property_list_prefetches();
+    # the queries below only run for instances loaded without them.
+
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            return PropertyImageSerializer(primary_image).data
+        primary_images = getattr(obj, 'primary_images', None)
+        if primary_images is None:
+            primary_images = obj.images.filter(is_primary=True)[:1]
+        if primary_images:
+            return PropertyImageSerializer(primary_images[0]).data
         return None
 
     def get_current_listing(self, obj):
-        active_listing = obj.listings.filter(listing_status='active').first()
+        active_listings = getattr(obj, 'active_listings', None)
+        if active_listings is None:
+            active_listings = obj.listings.filter(listing_status='active').order_by('-listing_date', '-id')[:1]
+        active_listing = active_listings[0] if active_listings else None
         if active_listing:
             return {
                 'id': active_listing.id,
@@ -168,8 +245,13 @@ class PropertyListSerializer(serializers.ModelSerializer):
         return None
 
 
-class PropertyDetailSerializer(serializers.ModelSerializer):
+class PropertyDetailSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Detailed serializer for individual property view"""
+    expandable_fields = (
+        'property_type', 'furnishing', 'owner', 'address', 'images',
+        'amenities', 'nearby_places', 'listings', 'reviews'
+    )
+
     property_type = PropertyTypeSerializer(read_only=True)
     furnishing = FurnishingTypeSerializer(read_only=True)
     owner = UserProfileSerializer(read_only=True)
@@ -179,7 +261,7 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
     nearby_places = NearbyPlaceSerializer(many=True, read_only=True)
     listings = ListingSerializer(many=True, read_only=True)
     reviews = serializers.SerializerMethodField()
-    average_rating = serializers.SerializerMethodField()
+    average_rating = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Property
@@ -193,12 +275,6 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
         reviews = obj.reviews.select_related('reviewer')[:5]  # Latest 5 reviews
         return ReviewRatingSerializer(reviews, many=True).data
 
-    def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews.exists():
-            return round(sum(review.rating for review in reviews) / reviews.count(), 1)
-        return None
-
 
 class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating properties"""
@@ -210,22 +286,24 @@ class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Property
-        exclude = ('owner',)  # Owner will be set in the view
+        exclude = ('owner', 'rating_count', 'rating_sum')  # Owner will be set in the view
 
+    @transaction.atomic
     def create(self, validated_data):
         amenities_data = validated_data.pop('amenities', [])
         property_instance = Property.objects.create(**validated_data)
 
-        # Handle amenities
-        for amenity in amenities_data:
-            PropertyAmenity.objects.create(
-                property=property_instance,
-                amenity=amenity,
-                available=True
-            )
+        # Handle amenities (one INSERT for all of them)
+        PropertyAmenity.objects.bulk_create([
+            PropertyAmenity(property=property_instance, amenity_id=amenity_id, available=True)
+            for amenity_id in {amenity.pk for amenity in amenities_data}
+        ], ignore_conflicts=True)
 
+        # Rebuild the search document's amenity array once, after all rows are written
+        schedule_search_document_refresh([property_instance.pk])
         return property_instance
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         amenities_data = validated_data.pop('amenities', None)
 
@@ -234,18 +312,36 @@ class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
 
-        # Update amenities if provided
-        if amenities_data is not None:
-            instance.property_amenities.all().delete()
-            for amenity in amenities_data:
-                PropertyAmenity.objects.create(
-                    property=instance,
-                    amenity=amenity,
-                    available=True
-                )
+        # Update amenities if provided. instance.save() has already scheduled a search
+        # document refresh through property_saved; this one joins the same on-commit batch
+        if amenities_data is not None and self.sync_amenities(instance, amenities_data):
+            schedule_search_document_refresh([instance.pk])
 
         return instance
 
+    def sync_amenities(self, property_instance, amenities):
+        """
+        Make `amenities` the property's available amenities with at most one delete, one
+        insert and one update, only for rows that differ. Returns whether anything changed.
+        """
+        wanted = {amenity.pk for amenity in amenities}
+        existing = dict(property_instance.property_amenities.values_list('amenity_id', 'available'))
+
+        removed = existing.keys() - wanted
+        added = wanted - existing.keys()
+        made_available = {amenity_id for amenity_id in wanted & existing.keys() if not existing[amenity_id]}
+
+        if removed:
+            property_instance.property_amenities.filter(amenity_id__in=removed).delete()
+        if added:
+            PropertyAmenity.objects.bulk_create([
+                PropertyAmenity(property=property_instance, amenity_id=amenity_id, available=True)
+                for amenity_id in added
+            ], ignore_conflicts=True)
+        if made_available:
+            property_instance.property_amenities.filter(amenity_id__in=made_available).update(available=True)
+        return bool(removed or added or made_available)
+
 
 class PropertyInquirySerializer(serializers.ModelSerializer):
     """Serializer for property inquiries"""
@@ -313,12 +409,12 @@ class UserPreferenceSerializer(serializers.ModelSerializer):
 # Search and Filter Serializers
 class PropertySearchSerializer(serializers.Serializer):
     """Serializer for property search parameters"""
-    location = serializers.CharField(required=False)
+    location = serializers.CharField(max_length=255, required=False)
     property_type = serializers.IntegerField(required=False)
     furnishing = serializers.IntegerField(required=False)
-    min_rent = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
-    max_rent = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
-    bedrooms = serializers.IntegerField(required=False)
+    min_rent = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    max_rent = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    bedrooms = serializers.IntegerField(min_value=0, required=False)
     bathrooms = serializers.IntegerField(required=False)
     min_area = serializers.IntegerField(required=False)
     max_area = serializers.IntegerField(required=False)
@@ -330,17 +426,29 @@ class PropertySearchSerializer(serializers.Serializer):
     parking_required = serializers.BooleanField(required=False)
     available_from = serializers.DateField(required=False)
 
+    # Searches are logged with these IDs as foreign keys (see buffers.SearchLogBuffer)
+
+    def validate_property_type(self, value):
+        if not PropertyType.objects.filter(pk=value).exists():
+            raise serializers.ValidationError("Unknown property type")
+        return value
+
+    def validate_furnishing(self, value):
+        if not FurnishingType.objects.filter(pk=value).exists():
+            raise serializers.ValidationError("Unknown furnishing type")
+        return value
+
     def validate(self, attrs):
         min_rent = attrs.get('min_rent')
         max_rent = attrs.get('max_rent')
 
-        if min_rent and max_rent and min_rent > max_rent:
+        if min_rent is not None and max_rent is not None and min_rent > max_rent:
             raise serializers.ValidationError("Min rent cannot be greater than max rent")
 
         min_area = attrs.get('min_area')
         max_area = attrs.get('max_area')
 
-        if min_area and max_area and min_area > max_area:
+        if min_area is not None and max_area is not None and min_area > max_area:
             raise serializers.ValidationError("Min area cannot be greater than max area")
 
         return attrs
\ No newline at end of file
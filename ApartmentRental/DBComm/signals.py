@@ -0,0 +1,187 @@
+# signals.py - Keep search documents, rating aggregates and cached details in sync, queue saved-search alerts
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import (
+    User, Address, Property, PropertyType, FurnishingType, PropertyAmenity,
+    Listing, PropertyImage, PropertySearchDocument, ReviewRating, NearbyPlace
+)
+from .search import schedule_search_document_refresh, search_document_listed, document_rating
+from .caching import bump_city_versions, bump_versions_on_commit, property_scope, user_scope
+from .alerts import listing_alerts
+
+
+@receiver(post_save, sender=Property)
+def property_saved(sender, instance, **kwargs):
+    schedule_search_document_refresh([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Listing)
+@receiver([post_save, post_delete], sender=PropertyImage)
+@receiver([post_save, post_delete], sender=PropertyAmenity)
+def property_child_changed(sender, instance, **kwargs):
+    schedule_search_document_refresh([instance.property_id])
+
+
+@receiver(m2m_changed, sender=Property.amenities.through)
+def property_amenities_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # instance is an Amenity; pk_set holds property IDs (None on clear)
+        property_ids = list(pk_set or instance.properties.values_list('id', flat=True))
+    else:
+        property_ids = [instance.pk]
+    schedule_search_document_refresh(property_ids)
+    bump_versions_on_commit(property_scope(property_id) for property_id in property_ids)
+
+
+@receiver(post_save, sender=Address)
+def address_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    property_ids = list(instance.properties.values_list('id', flat=True))
+    schedule_search_document_refresh(property_ids)
+    bump_versions_on_commit(property_scope(property_id) for property_id in property_ids)
+
+
+@receiver(post_save, sender=PropertyType)
+def property_type_saved(sender, instance, created, **kwargs):
+    if not created:
+        PropertySearchDocument.objects.filter(property_type=instance).update(
+            property_type_name=instance.type_name
+        )
+
+
+@receiver(post_save, sender=FurnishingType)
+def furnishing_type_saved(sender, instance, created, **kwargs):
+    if not created:
+        PropertySearchDocument.objects.filter(furnishing=instance).update(
+            furnishing_type_name=instance.furnishing_type
+        )
+
+
+@receiver(post_delete, sender=PropertySearchDocument)
+def search_document_deleted(sender, instance, **kwargs):
+    # Covers documents removed by cascade when a property or listing is deleted
+    bump_city_versions([instance.city])
+
+
+@receiver(search_document_listed)
+def queue_listing_alerts(sender, documents, **kwargs):
+    listing_alerts.enqueue(documents)
+
+
+def apply_rating_change(property_id, count_delta, sum_delta):
+    """Adjust a property's review aggregates, its owner's rollup and its search document in place"""
+    with transaction.atomic():
+        Property.objects.filter(pk=property_id).update(
+            rating_count=F('rating_count') + count_delta,
+            rating_sum=F('rating_sum') + sum_delta
+        )
+        aggregates = Property.objects.filter(pk=property_id).values_list(
+            'owner_id', 'rating_count', 'rating_sum'
+        ).first()
+        if aggregates is None:
+            return
+        owner_id, rating_count, rating_sum = aggregates
+        if owner_id:
+            User.objects.filter(pk=owner_id).update(
+                rating_count=F('rating_count') + count_delta,
+                rating_sum=F('rating_sum') + sum_delta
+            )
+        PropertySearchDocument.objects.filter(pk=property_id).update(
+            average_rating=document_rating(rating_sum, rating_count)
+        )
+        bump_versions_on_commit([property_scope(property_id)] + ([user_scope(owner_id)] if owner_id else []))
+
+
+@receiver(pre_save, sender=ReviewRating)
+def review_saving(sender, instance, **kwargs):
+    # Remember what an edited review counted for before the change
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = ReviewRating.objects.filter(pk=instance.pk).values_list(
+            'property_id', 'rating'
+        ).first()
+
+
+@receiver(post_save, sender=ReviewRating)
+def review_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        apply_rating_change(instance.property_id, 1, instance.rating)
+        return
+
+    previous_property_id, previous_rating = previous
+    if previous_property_id != instance.property_id:
+        apply_rating_change(previous_property_id, -1, -previous_rating)
+        apply_rating_change(instance.property_id, 1, instance.rating)
+    elif previous_rating != instance.rating:
+        apply_rating_change(instance.property_id, 0, instance.rating - previous_rating)
+
+
+@receiver(post_delete, sender=ReviewRating)
+def review_deleted(sender, instance, **kwargs):
+    # Also runs when reviews are cascaded from a deleted property, before the property
+    # row itself goes, which takes its share out of the owner's rollup
+    apply_rating_change(instance.property_id, -1, -instance.rating)
+
+
+@receiver(pre_save, sender=Property)
+def property_saving(sender, instance, update_fields=None, **kwargs):
+    # The stored owner and rollup: the instance's counters are left stale by
+    # CounterFieldsMixin, so they cannot say what the property contributes
+    instance._previous_rollup = None
+    if instance.pk and (update_fields is None or {'owner', 'owner_id'} & set(update_fields)):
+        instance._previous_rollup = Property.objects.filter(pk=instance.pk).values_list(
+            'owner_id', 'rating_count', 'rating_sum'
+        ).first()
+
+
+@receiver(post_save, sender=Property)
+def property_owner_changed(sender, instance, **kwargs):
+    # Move the property's review aggregates between owner rollups
+    previous = getattr(instance, '_previous_rollup', None)
+    if previous is None:
+        return
+    previous_owner_id, rating_count, rating_sum = previous
+    if previous_owner_id == instance.owner_id or not rating_count:
+        return
+    with transaction.atomic():
+        if previous_owner_id:
+            User.objects.filter(pk=previous_owner_id).update(
+                rating_count=F('rating_count') - rating_count,
+                rating_sum=F('rating_sum') - rating_sum
+            )
+        if instance.owner_id:
+            User.objects.filter(pk=instance.owner_id).update(
+                rating_count=F('rating_count') + rating_count,
+                rating_sum=F('rating_sum') + rating_sum
+            )
+    bump_versions_on_commit(user_scope(owner_id) for owner_id in (previous_owner_id, instance.owner_id) if owner_id)
+
+
+# Cached property details: tagged with the versions of the property's scope and its
+# owner's (see PropertyDetailView.retrieve)
+
+@receiver([post_save, post_delete], sender=Property)
+def property_detail_changed(sender, instance, **kwargs):
+    bump_versions_on_commit([property_scope(instance.pk)])
+
+
+@receiver([post_save, post_delete], sender=Listing)
+@receiver([post_save, post_delete], sender=PropertyImage)
+@receiver([post_save, post_delete], sender=PropertyAmenity)
+@receiver([post_save, post_delete], sender=NearbyPlace)
+@receiver([post_save, post_delete], sender=ReviewRating)
+def property_detail_child_changed(sender, instance, **kwargs):
+    bump_versions_on_commit([property_scope(instance.property_id)])
+
+
+@receiver(post_save, sender=User)
+def user_detail_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump_versions_on_commit([user_scope(instance.pk)])
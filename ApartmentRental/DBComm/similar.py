@@ -0,0 +1,139 @@
+# similar.py - Nearest-neighbour "similar properties" index over the feature matrix
+
+import logging
+import threading
+import time
+
+import numpy as np
+from django.db import close_old_connections
+from .features import property_features, FEATURE_REFRESH_INTERVAL
+from .geo import KM_PER_DEGREE
+
+logger = logging.getLogger(__name__)
+
+# Weight of each feature group in the Euclidean distance; a difference of 1.0 after
+# weighting counts as one "unit" of dissimilarity
+SIMILARITY_WEIGHTS = {
+    'rent': 4.0,        # per unit of log(rent), i.e. ~0.4 for a 10% difference
+    'bedrooms': 1.0,
+    'bathrooms': 0.5,
+    'area': 2.0,        # per unit of log(area)
+    'distance': 1 / 3,  # per km from the other property
+    'property_type': 1.0,
+    'furnishing': 0.5,
+    'amenities': 0.35,  # per amenity one has and the other lacks
+}
+
+
+def _one_hot(values, weight):
+    codes, inverse = np.unique(values, return_inverse=True)
+    matrix = np.zeros((len(values), len(codes)), dtype=np.float32)
+    matrix[np.arange(len(values)), inverse] = weight
+    return matrix
+
+
+def _city_centred(values, cities):
+    """Coordinates relative to their city's mean, with missing ones placed at the centre"""
+    known = ~np.isnan(values)
+    totals = np.bincount(cities[known], weights=values[known], minlength=cities.max() + 1)
+    counts = np.bincount(cities[known], minlength=cities.max() + 1)
+    means = np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+    return np.where(known, values - means[cities], 0.0)
+
+
+def build_vectors(snapshot):
+    """Weighted feature vector per snapshot row, so similarity is plain Euclidean distance"""
+    columns = snapshot.columns
+    cities = columns['city']
+    area = columns['area'].astype(np.float64)
+    area = np.where(np.isnan(area), np.nanmedian(area) if (~np.isnan(area)).any() else 0.0, area)
+    lat_km = _city_centred(columns['latitude'], cities) * KM_PER_DEGREE
+    lng_km = _city_centred(columns['longitude'], cities) * KM_PER_DEGREE * np.cos(
+        np.radians(np.nan_to_num(columns['latitude']))
+    )
+
+    parts = [
+        np.log1p(columns['rent'])[:, None] * SIMILARITY_WEIGHTS['rent'],
+        columns['bedrooms'][:, None] * SIMILARITY_WEIGHTS['bedrooms'],
+        columns['bathrooms'][:, None] * SIMILARITY_WEIGHTS['bathrooms'],
+        np.log1p(area)[:, None] * SIMILARITY_WEIGHTS['area'],
+        np.column_stack([lat_km, lng_km]) * SIMILARITY_WEIGHTS['distance'],
+        _one_hot(columns['property_type'], SIMILARITY_WEIGHTS['property_type']),
+        _one_hot(columns['furnishing'], SIMILARITY_WEIGHTS['furnishing']),
+        columns['amenities'] * SIMILARITY_WEIGHTS['amenities'],
+    ]
+    return np.hstack(parts).astype(np.float32)
+
+
+class SimilarPropertyIndex:
+    """
+    Brute-force kNN over precomputed vectors, searched within the property's city only.
+    A background thread follows the incrementally refreshed feature matrix and rebuilds
+    the vectors whenever it changes, so requests only do one matrix-vector product.
+    """
+
+    def __init__(self):
+        self.state = None  # (snapshot, vectors, squared norms, city code -> live rows)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def rebuild(self):
+        snapshot = property_features.get()
+        if self.state is not None and self.state[0] is snapshot:
+            return
+
+        vectors = build_vectors(snapshot) if len(snapshot.ids) else np.zeros((0, 0), dtype=np.float32)
+        squared_norms = np.einsum('ij,ij->i', vectors, vectors)
+        live_rows = np.flatnonzero(snapshot.alive)
+        cities = snapshot.columns['city'][live_rows] if len(snapshot.ids) else live_rows
+        rows_by_city = {
+            int(city): live_rows[cities == city]
+            for city in np.unique(cities)
+        }
+        self.state = (snapshot, vectors, squared_norms, rows_by_city)
+
+    def similar(self, property_id, limit):
+        """[(property_id, distance)] closest first, or None if the property is not indexed"""
+        self._ensure_worker()
+        if self.state is None:
+            self.rebuild()
+        snapshot, vectors, squared_norms, rows_by_city = self.state
+
+        row = snapshot.rows.get(property_id)
+        if row is None or not snapshot.alive[row]:
+            return None
+
+        candidates = rows_by_city.get(int(snapshot.columns['city'][row]), np.zeros(0, dtype=np.int64))
+        candidates = candidates[candidates != row]
+        if not len(candidates):
+            return []
+
+        distances = squared_norms[candidates] - 2 * (vectors[candidates] @ vectors[row]) + squared_norms[row]
+        limit = min(limit, len(candidates))
+        nearest = np.argpartition(distances, limit - 1)[:limit]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return [
+            (int(snapshot.ids[candidates[index]]), round(float(np.sqrt(max(distances[index], 0))), 4))
+            for index in nearest
+        ]
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='similar-properties', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(FEATURE_REFRESH_INTERVAL)
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception('Rebuilding the similar properties index failed')
+            finally:
+                close_old_connections()
+
+
+similar_index = SimilarPropertyIndex()
@@ -1,3 +1,659 @@
-from django.test import TestCase
+import datetime
+import itertools
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction, IntegrityError
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from .models import (
+    User, Address, PropertyType, FurnishingType, Amenity, Property, PropertyAmenity, Listing, PropertyImage,
+    SavedProperty, PropertySearchDocument, UserSearch, ReviewRating, NotificationOutbox
+)
+from .alerts import listing_alerts
+from .buffers import SearchLogBuffer, ListingViewBuffer
+from .caching import get_versions, LOCALITY_SET
+from .fieldsets import Fieldset
+from .readers import property_list_reader, saved_property_reader
+from .renderers import FastJSONRenderer, orjson
+from .search import load_properties, search_documents
+from .serializers import (
+    PropertyListSerializer, SavedPropertySerializer, PropertyCreateUpdateSerializer, BULK_LISTING_MAX_ITEMS
+)
+
+
+class PropertyFixtures:
+    """Builders for the users, properties and listings the test cases below set up"""
+    phone_numbers = itertools.count(9000000000)
+
+    @classmethod
+    def create_user(cls, username, **fields):
+        return User.objects.create_user(
+            username=username, password='password', phone_number=str(next(cls.phone_numbers)), **fields
+        )
+
+    @classmethod
+    def create_property(cls, title, city='Bengaluru', address=None, **fields):
+        address = Address.objects.create(**{
+            'street_address': f'{title}, 100 Feet Road', 'locality': 'Indiranagar', 'city': city,
+            'state': 'Karnataka', 'pincode': '560038', **(address or {})
+        })
+        fields.setdefault('property_type', PropertyType.objects.get_or_create(type_name='Apartment')[0])
+        fields.setdefault('bedrooms', 2)
+        fields.setdefault('bathrooms', 2)
+        return Property.objects.create(address=address, title=title, **fields)
+
+    @classmethod
+    def create_listing(cls, property_obj, monthly_rent='25000', **fields):
+        return Listing.objects.create(
+            property=property_obj, monthly_rent=Decimal(monthly_rent), security_deposit=Decimal('100000'), **fields
+        )
+
+
+class PropertyListQueryCountTests(PropertyFixtures, TestCase):
+    """The property list must cost the same number of queries whatever the page size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = cls.create_user('owner', user_type='owner', first_name='Asha', last_name='Rao')
+        furnishing = FurnishingType.objects.create(furnishing_type='Semi-Furnished')
+
+        # Search documents are refreshed on commit
+        with cls.captureOnCommitCallbacks(execute=True):
+            for index in range(25):
+                property_obj = cls.create_property(
+                    f'2BHK Flat {index}', owner=owner, furnishing=furnishing, total_area_sqft=1000
+                )
+                cls.create_listing(property_obj)
+                PropertyImage.objects.create(
+                    property=property_obj, image=f'property_images/{index}.jpg', image_type='main', is_primary=True
+                )
+
+    def get_query_count(self, page_size):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dbcomm:property_list'), {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+
+        results = response.json()['results']
+        self.assertEqual(len(results), page_size)
+        self.assertIsNotNone(results[0]['primary_image'])
+        self.assertEqual(results[0]['current_listing']['monthly_rent'], 25000)
+        return len(queries)
+
+    def test_query_count_is_independent_of_page_size(self):
+        self.assertEqual(self.get_query_count(5), self.get_query_count(20))
+
+
+class PropertyListReaderTests(PropertyFixtures, TestCase):
+    """The lean reader must return exactly what PropertyListSerializer does"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = cls.create_user('owner', user_type='owner', first_name='Asha', last_name='')
+        cls.tenant = cls.create_user('tenant')
+        furnishing = FurnishingType.objects.create(furnishing_type='Semi-Furnished')
+        location = {'latitude': Decimal('12.97160000')}
+
+        # Full listing: owner, furnishing, a primary image and two active listings
+        complete = cls.create_property(
+            'Complete', address=location, owner=owner, furnishing=furnishing, total_area_sqft=1000
+        )
+        cls.create_listing(complete, '24000')
+        cls.create_listing(complete, '25000.50', negotiable=True)
+        PropertyImage.objects.create(
+            property=complete, image='property_images/a.jpg', image_type='main', is_primary=True, caption='Hall'
+        )
+        PropertyImage.objects.create(property=complete, image='property_images/b.jpg', image_type='bedroom')
+        Property.objects.filter(pk=complete.pk).update(rating_count=3, rating_sum=13)
+
+        # Bare listing: no owner, furnishing, image or listing
+        bare = cls.create_property('Bare', address=location)
+
+        cls.property_ids = [bare.pk, complete.pk]
+        SavedProperty.objects.create(user=cls.tenant, property=complete, notes='Near metro')
+        SavedProperty.objects.create(user=cls.tenant, property=bare)
+
+    def test_property_payload_matches_serializer(self):
+        expected = PropertyListSerializer(load_properties(self.property_ids), many=True).data
+        results = property_list_reader().read(self.property_ids)
+
+        self.assertEqual(results, expected)
+        self.assertEqual([list(item) for item in results], [list(item) for item in expected])
+
+    def test_sparse_payload_matches_serializer(self):
+        fieldset = Fieldset(
+            fields=frozenset({'title', 'address', 'owner_name', 'current_listing'}),
+            expand=frozenset({'current_listing'})
+        )
+        properties = load_properties(self.property_ids)
+        expected = PropertyListSerializer(properties, many=True, context={'fieldset': fieldset}).data
+
+        with self.assertNumQueries(2):
+            results = property_list_reader(fieldset).read(self.property_ids)
+        self.assertEqual(results, expected)
+        self.assertEqual(list(results[1]), ['id', 'title', 'address', 'owner_name', 'current_listing'])
+
+    def test_saved_property_payload_matches_serializer(self):
+        saved_properties = SavedProperty.objects.filter(user=self.tenant).order_by('pk')
+        expected = SavedPropertySerializer(saved_properties, many=True).data
+        results = saved_property_reader().read(saved_properties.values_list('pk', flat=True))
+
+        self.assertEqual(results, expected)
+        self.assertEqual([list(item) for item in results], [list(item) for item in expected])
+
+
+class KeysetPaginationTests(PropertyFixtures, TestCase):
+    """Cursor pages of the property list must follow the requested sort"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = cls.create_user('owner')
+        with cls.captureOnCommitCallbacks(execute=True):
+            for index, rent in enumerate(['30000', '18000.50', '25000', '18000.50', '42000']):
+                cls.create_listing(cls.create_property(f'2BHK Flat {index}', owner=owner), rent)
+
+    def test_unsupported_ordering_is_rejected(self):
+        for params in ({'search': 'flat'}, {'ordering': 'price_per_sqft'}):
+            response = self.client.get(reverse('dbcomm:property_list'), {**params, 'cursor': ''})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('cursor', response.json())
+
+    def test_rent_cursor_pages_round_trip(self):
+        expected = list(PropertySearchDocument.objects.order_by('monthly_rent', 'pk').values_list('pk', flat=True))
+
+        seen = []
+        response = self.client.get(
+            reverse('dbcomm:property_list'), {'ordering': 'monthly_rent', 'cursor': '', 'page_size': 2}
+        )
+        while True:
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            seen += [item['id'] for item in page['results']]
+            if page['next'] is None:
+                break
+            response = self.client.get(page['next'])
+        self.assertEqual(seen, expected)
+
+        # Walking back from the last page returns the page before it
+        previous = self.client.get(page['previous']).json()
+        self.assertEqual([item['id'] for item in previous['results']], expected[2:4])
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer must match JSONRenderer byte for byte, floats excepted"""
+
+    def test_output_matches_json_renderer(self):
+        data = {
+            'id': 1, 'title': 'Flat\u2028with a view', 'city': 'Bengaluru \u0928\u0917\u0930',
+            'monthly_rent': Decimal('25000.50'), 'ratio': 0.25, 'negotiable': True, 'caption': None,
+            'created_at': datetime.datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc),
+            'available_from': datetime.date(2024, 2, 1), 'amenities': [1, 2, 3], 7: 'non-string key',
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_accepted_float_differences(self):
+        data = {'large': 1e16, 'small': 1e-7}
+        self.assertEqual(FastJSONRenderer().render(data), b'{"large":1e16,"small":1e-7}')
+        self.assertEqual(JSONRenderer().render(data), b'{"large":1e+16,"small":1e-07}')
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), data)
+
+        # JSONRenderer refuses non-finite floats; orjson writes null
+        self.assertEqual(FastJSONRenderer().render({'nan': float('nan')}), b'{"nan":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'nan': float('nan')})
+
+
+class ImportPropertiesTests(PropertyFixtures, TestCase):
+    """import_properties loads the valid rows of a batch and reports every rejected line"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = cls.create_user('owner')
+        cls.landlord = cls.create_user('landlord')
+        PropertyType.objects.create(type_name='Apartment')
+        cls.parking = Amenity.objects.create(amenity_name='Parking')
+
+    def row(self, title, **values):
+        return {
+            'title': title, 'property_type': 'apartment', 'bedrooms': 2, 'bathrooms': 1,
+            'street_address': f'{title}, 100 Feet Road', 'locality': 'Indiranagar', 'city': 'Bengaluru',
+            'state': 'Karnataka', 'pincode': '560038', **values
+        }
+
+    def run_import(self, lines, **options):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False, encoding='utf-8') as stream:
+            stream.write('\n'.join(lines) + '\n')
+        self.addCleanup(os.remove, stream.name)
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_properties', stream.name, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue().splitlines()
+
+    def test_mixed_batch(self):
+        stdout, errors = self.run_import([
+            json.dumps(self.row(
+                'Listed', monthly_rent='25000', security_deposit='100000', negotiable='no',
+                amenities=['parking'], images=['main=property_images/listed.jpg']
+            )),
+            '{"title": ',
+            '[1, 2]',
+            json.dumps(self.row('Castle', property_type='castle', bedrooms=-1)),
+            '',
+            json.dumps(self.row('Unlisted', owner='landlord')),
+            json.dumps(self.row('Orphan', owner='nobody')),
+        ], owner='owner', batch_size=2)
+
+        self.assertIn('Imported 2 properties, 4 rows failed', stdout)
+        self.assertEqual([error.split(':')[0] for error in errors], ['Line 2', 'Line 3', 'Line 4', 'Line 7'])
+        self.assertEqual(errors[1], 'Line 3: Expected a JSON object')
+        self.assertIn('property_type: Unknown property type "castle"', errors[2])
+        self.assertIn('bedrooms:', errors[2])
+        self.assertEqual(errors[3], 'Line 7: owner: Unknown user "nobody"')
+
+        listed = Property.objects.get(title='Listed')
+        self.assertEqual(listed.owner, self.owner)
+        self.assertEqual(list(listed.amenities.all()), [self.parking])
+        self.assertEqual(listed.images.get().image.name, 'property_images/listed.jpg')
+        self.assertFalse(listed.listings.get().negotiable)
+        self.assertEqual(Property.objects.get(title='Unlisted').owner, self.landlord)
+        self.assertEqual(Property.objects.count(), 2)
+
+    def test_owner_is_required(self):
+        stdout, errors = self.run_import([json.dumps(self.row('Ownerless'))])
+        self.assertIn('Imported 0 properties, 1 rows failed', stdout)
+        self.assertIn('owner:', errors[0])
+
+        stdout, errors = self.run_import([json.dumps(self.row('Ownerless'))], allow_no_owner=True)
+        self.assertIn('Imported 1 properties, 0 rows failed', stdout)
+        self.assertIsNone(Property.objects.get(title='Ownerless').owner)
+
+    def test_malformed_values_are_row_errors(self):
+        stdout, errors = self.run_import([
+            json.dumps(self.row('Listed', images=[{'image': 'property_images/listed.jpg', 'caption': 'Front'}])),
+            json.dumps(self.row('Primary', images=[{'image': 'property_images/a.jpg', 'is_primary': True}])),
+            json.dumps(self.row('Listy', owner=['owner'])),
+            json.dumps(self.row('Dicty', owner={'username': 'owner'})),
+        ], owner='owner')
+
+        self.assertIn('Imported 1 properties, 3 rows failed', stdout)
+        self.assertEqual(errors, [
+            'Line 2: images: Image 1: unknown keys is_primary',
+            'Line 3: owner: Owner must be a username',
+            'Line 4: owner: Owner must be a username',
+        ])
+        image = Property.objects.get(title='Listed').images.get()
+        self.assertEqual((image.caption, image.image_type, image.is_primary), ('Front', 'main', True))
+
+
+class BulkListingUpdateTests(PropertyFixtures, TestCase):
+    """The bulk listing update changes only the caller's listings and reports every item"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = cls.create_user('owner', user_type='owner')
+        other_owner = cls.create_user('other', user_type='owner')
+        cls.listing = cls.create_listing(cls.create_property('Own', owner=cls.owner))
+        cls.other_listing = cls.create_listing(cls.create_property('Other', owner=other_owner))
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def bulk_update(self, data):
+        return self.client.post(reverse('dbcomm:listing-bulk-update'), data, content_type='application/json')
+
+    def test_listings_not_owned_are_not_found(self):
+        response = self.bulk_update({
+            'ids': [str(self.listing.pk), self.other_listing.pk, 999999], 'monthly_rent': '30000'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(
+            [result['status'] for result in response.json()['results']], ['updated', 'not_found', 'not_found']
+        )
+
+        self.listing.refresh_from_db()
+        self.other_listing.refresh_from_db()
+        self.assertEqual(self.listing.monthly_rent, Decimal('30000'))
+        self.assertEqual(self.other_listing.monthly_rent, Decimal('25000'))
+
+    def test_ids_must_be_integers(self):
+        response = self.bulk_update({'ids': [True], 'monthly_rent': '30000'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ids', response.json())
+
+    def test_duplicate_items_are_rejected(self):
+        response = self.bulk_update({'items': [
+            {'id': self.listing.pk, 'listing_status': 'rented'},
+            {'id': self.listing.pk, 'monthly_rent': '1'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['updated', 'invalid'])
+        self.assertEqual(results[1]['errors'], ['Listing given more than once'])
+
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.listing_status, 'rented')
+        self.assertEqual(self.listing.monthly_rent, Decimal('25000'))
+
+    def test_item_limit(self):
+        too_many = range(1, BULK_LISTING_MAX_ITEMS + 2)
+        response = self.bulk_update({'ids': list(too_many), 'listing_status': 'inactive'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ids', response.json())
+
+        response = self.bulk_update({'items': [{'id': pk, 'listing_status': 'inactive'} for pk in too_many]})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.bulk_update({'ids': list(too_many)[:-1], 'listing_status': 'inactive'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 1)
+
+
+class InquiryContactCountTests(PropertyFixtures, TestCase):
+    """Each inquiry adds one to its listing's contact count"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = cls.create_user('tenant')
+        cls.listing = cls.create_listing(cls.create_property('Own', owner=cls.create_user('owner', user_type='owner')))
+
+    def test_inquiries_increment_contact_count(self):
+        self.client.force_login(self.tenant)
+        data = {'property': self.listing.property_id, 'listing': self.listing.pk, 'message': 'Is it available?'}
+        for _ in range(2):
+            response = self.client.post(reverse('dbcomm:inquiry_create'), data, content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+
+        self.listing.refresh_from_db(fields=['contact_count'])
+        self.assertEqual(self.listing.contact_count, 2)
+
+
+class SearchLogBufferTests(PropertyFixtures, TestCase):
+    """Logged searches are deduplicated per user and a bad row never blocks the rest"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user('tenant')
+
+    def setUp(self):
+        # Flushed by hand below, never from a worker thread
+        self.buffer = SearchLogBuffer()
+        patcher = mock.patch.object(self.buffer, 'notify')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_typing_collapses_but_empty_location_does_not(self):
+        self.buffer.record(self.user.pk, {'location': 'Indira', 'bedrooms': 2})
+        self.buffer.record(self.user.pk, {'location': 'Indiranagar', 'bedrooms': 2})
+        self.buffer.record(self.user.pk, {'location': '', 'bedrooms': 2})
+        self.buffer.record(self.user.pk, {'location': 'Indiranagar', 'bedrooms': 2})  # repeat
+        self.buffer.flush()
+
+        self.assertEqual(
+            sorted(UserSearch.objects.values_list('location', flat=True)), ['', 'Indiranagar']
+        )
+
+    def test_rejected_row_is_dropped_and_the_rest_written(self):
+        # Breaks the min_rent_lte_max_rent check constraint
+        self.buffer.record(self.user.pk, {'location': 'Indiranagar', 'min_rent': Decimal(5), 'max_rent': Decimal(0)})
+        self.buffer.record(self.user.pk, {'location': 'Koramangala'})
+        with self.assertLogs('DBComm.buffers', 'WARNING'):
+            self.buffer.flush()
+
+        self.assertEqual(list(UserSearch.objects.values_list('location', flat=True)), ['Koramangala'])
+        self.assertEqual(self.buffer.drain(), {})
+
+
+class RatingAggregateTests(PropertyFixtures, TestCase):
+    """Review changes keep property aggregates and owner rollups exact"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = cls.create_user('owner', user_type='owner')
+        cls.other_owner = cls.create_user('other', user_type='owner')
+        cls.tenant = cls.create_user('tenant')
+        cls.property = cls.create_property('Own', owner=cls.owner)
+        cls.other_property = cls.create_property('Other', owner=cls.other_owner)
+
+    def assertAggregates(self, instance, rating_count, rating_sum):
+        instance.refresh_from_db(fields=['rating_count', 'rating_sum'])
+        self.assertEqual((instance.rating_count, instance.rating_sum), (rating_count, rating_sum))
+
+    def test_review_lifecycle(self):
+        review = ReviewRating.objects.create(property=self.property, reviewer=self.tenant, rating=4)
+        ReviewRating.objects.create(property=self.property, reviewer=self.other_owner, rating=2)
+        self.assertAggregates(self.property, 2, 6)
+        self.assertAggregates(self.owner, 2, 6)
+
+        review.rating = 5
+        review.save()
+        self.assertAggregates(self.property, 2, 7)
+        self.assertAggregates(self.owner, 2, 7)
+
+        # Moved to another owner's property
+        review.property = self.other_property
+        review.save()
+        self.assertAggregates(self.property, 1, 2)
+        self.assertAggregates(self.owner, 1, 2)
+        self.assertAggregates(self.other_property, 1, 5)
+        self.assertAggregates(self.other_owner, 1, 5)
+
+        review.delete()
+        self.assertAggregates(self.other_property, 0, 0)
+        self.assertAggregates(self.other_owner, 0, 0)
+
+    def test_owner_change_moves_stored_aggregates(self):
+        stale = Property.objects.get(pk=self.property.pk)  # loaded before any review
+        ReviewRating.objects.create(property=self.property, reviewer=self.tenant, rating=4)
+        ReviewRating.objects.create(property=self.property, reviewer=self.other_owner, rating=3)
+
+        stale.owner = self.other_owner
+        stale.save()
+        self.assertAggregates(stale, 2, 7)  # stale counters were not written back
+        self.assertAggregates(self.owner, 0, 0)
+        self.assertAggregates(self.other_owner, 2, 7)
+
+    def test_save_of_deleted_or_forced_instance(self):
+        Property.objects.filter(pk=self.property.pk).delete()
+        self.property.save()  # inserted again, as Model.save() would
+        self.assertTrue(Property.objects.filter(pk=self.property.pk).exists())
+
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                self.property.save(force_insert=True)  # a duplicate key, not a ValueError
+
+
+class SearchResultCacheTests(PropertyFixtures, TestCase):
+    """Cached search pages are evicted by changes in the cities they cover, and only those"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = cls.create_user('owner')
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.bengaluru = cls.create_listing(cls.create_property('Bengaluru Flat', owner=owner))
+            cls.mumbai = cls.create_listing(cls.create_property(
+                'Mumbai Flat', city='Mumbai', owner=owner,
+                address={'locality': 'Bandra', 'state': 'Maharashtra', 'pincode': '400050'}
+            ))
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('DBComm.views.search_documents', wraps=search_documents)
+        self.search_documents = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def search(self, **filters):
+        response = self.client.post(reverse('dbcomm:property_search'), filters, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_listing_change_evicts_only_its_city(self):
+        self.assertEqual(self.search(location='Bengaluru', max_rent='28000'), [self.bengaluru.property_id])
+        self.assertEqual(self.search(location='Mumbai', max_rent='28000'), [self.mumbai.property_id])
+        self.search(location='Mumbai', max_rent='28000')
+        self.assertEqual(self.search_documents.call_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bengaluru.monthly_rent = Decimal('30000')
+            self.bengaluru.save()
+
+        self.assertEqual(self.search(location='Bengaluru', max_rent='28000'), [])
+        self.assertEqual(self.search(location='Mumbai', max_rent='28000'), [self.mumbai.property_id])
+        self.assertEqual(self.search_documents.call_count, 3)
+
+    def test_new_locality_evicts_location_searches(self):
+        self.assertEqual(self.search(location='Koramangala'), [])
+        version = get_versions([LOCALITY_SET])[LOCALITY_SET]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = self.create_listing(self.create_property('New Flat', address={'locality': 'Koramangala'}))
+
+        self.assertNotEqual(get_versions([LOCALITY_SET])[LOCALITY_SET], version)
+        self.assertEqual(self.search(location='Koramangala'), [listing.property_id])
+
+
+class PropertyDetailCacheTests(PropertyFixtures, TestCase):
+    """Cached property details are served until the property, a child row or its owner changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = cls.create_user('owner', user_type='owner', first_name='Asha')
+        cls.listing = cls.create_listing(cls.create_property('Flat', owner=cls.owner))
+
+    def setUp(self):
+        cache.clear()
+
+    def detail(self):
+        response = self.client.get(reverse('dbcomm:property_detail', args=[self.listing.property_id]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_listing_change_invalidates(self):
+        self.detail()
+        # Queryset updates send no signals, so the cached copy is still served
+        Property.objects.filter(pk=self.listing.property_id).update(title='Renamed')
+        self.assertEqual(self.detail()['title'], 'Flat')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing.monthly_rent = Decimal('30000')
+            self.listing.save()
+
+        data = self.detail()
+        self.assertEqual(data['title'], 'Renamed')
+        self.assertEqual(Decimal(str(data['listings'][0]['monthly_rent'])), Decimal('30000'))
+
+    def test_owner_change_invalidates(self):
+        self.assertEqual(self.detail()['owner']['first_name'], 'Asha')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.first_name = 'Anita'
+            self.owner.save()
+
+        self.assertEqual(self.detail()['owner']['first_name'], 'Anita')
+
+
+class ListingViewBufferTests(PropertyFixtures, TestCase):
+    """Views are counted once per visitor and added to active listings and the search document"""
+
+    @classmethod
+    def setUpTestData(cls):
+        property_obj = cls.create_property('Flat', owner=cls.create_user('owner'))
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.listing = cls.create_listing(property_obj)
+        cls.inactive_listing = cls.create_listing(property_obj, listing_status='inactive')
+
+    def setUp(self):
+        cache.clear()
+        # Flushed by hand below, never from a worker thread
+        self.buffer = ListingViewBuffer()
+        patcher = mock.patch.object(self.buffer, 'notify')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeat_views_are_counted_once(self):
+        property_id = self.listing.property_id
+        self.buffer.record(property_id, 'user:1')
+        self.buffer.record(property_id, 'user:1')
+        self.buffer.record(property_id, 'session:abc')
+        self.buffer.record(property_id)  # no visitor: always counted
+        self.buffer.flush()
+
+        self.assertEqual(Listing.objects.get(pk=self.listing.pk).views_count, 3)
+        self.assertEqual(Listing.objects.get(pk=self.inactive_listing.pk).views_count, 0)
+        self.assertEqual(PropertySearchDocument.objects.get(pk=property_id).views_count, 3)
+        self.assertEqual(self.buffer.drain(), {})
+
+
+class ListingAlertTests(PropertyFixtures, TestCase):
+    """A newly listed property notifies the users whose saved searches it matches, and only then"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = cls.create_user('owner', user_type='owner')
+        cls.tenant = cls.create_user('tenant')
+        cls.other_tenant = cls.create_user('other')
+        UserSearch.objects.create(user=cls.tenant, location='indiranagar', max_rent=Decimal('30000'))
+        UserSearch.objects.create(user=cls.other_tenant, location='Indiranagar', max_rent=Decimal('20000'))
+        UserSearch.objects.create(user=cls.owner, location='Bengaluru')  # their own listing
+
+    def setUp(self):
+        cache.clear()
+        # The module-level index outlives each test's rolled-back data
+        listing_alerts.index.built_at = None
+
+    def test_matching_searches_are_notified(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = self.create_listing(self.create_property('Flat', owner=self.owner))
+
+        notifications = NotificationOutbox.objects.all()
+        self.assertEqual({notification.user_id for notification in notifications}, {self.tenant.pk})
+        self.assertEqual(
+            sorted(notifications.values_list('channel', flat=True)),
+            sorted(channel for channel, _ in NotificationOutbox.CHANNEL_CHOICES)
+        )
+        self.assertEqual({notification.listing_id for notification in notifications}, {listing.pk})
+
+    def test_rebuild_does_not_notify(self):
+        # Search documents are only built by the rebuild below; on-commit refreshes never run
+        property_obj = self.create_property('Flat', owner=self.owner)
+        self.create_listing(property_obj)
+
+        call_command('rebuild_search_documents', stdout=StringIO())
+        self.assertTrue(PropertySearchDocument.objects.filter(pk=property_obj.pk).exists())
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+
+class AmenitySyncTests(PropertyFixtures, TestCase):
+    """Updating a property's amenities writes only the rows that differ"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.property = cls.create_property('Flat')
+        cls.parking = Amenity.objects.create(amenity_name='Parking')
+        cls.gym = Amenity.objects.create(amenity_name='Gym')
+        PropertyAmenity.objects.create(property=cls.property, amenity=cls.parking, available=True)
+
+    def sync(self, *amenities):
+        return PropertyCreateUpdateSerializer().sync_amenities(self.property, amenities)
+
+    def test_unchanged_amenities_are_not_written(self):
+        with self.assertNumQueries(1):  # reading the current rows
+            self.assertFalse(self.sync(self.parking))
+
+    def test_only_differing_rows_are_written(self):
+        PropertyAmenity.objects.create(property=self.property, amenity=self.gym, available=False)
+        with self.assertNumQueries(2):  # reading the current rows, then one UPDATE
+            self.assertTrue(self.sync(self.parking, self.gym))
+        self.assertEqual(
+            set(self.property.property_amenities.values_list('amenity_id', 'available')),
+            {(self.parking.pk, True), (self.gym.pk, True)}
+        )
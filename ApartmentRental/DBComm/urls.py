@@ -21,11 +21,13 @@ urlpatterns = [
     # Property URLs
     path('properties/', views.PropertyListView.as_view(), name='property_list'),
     path('properties/search/', views.search_properties, name='property_search'),
+    path('properties/facets/', views.property_facets, name='property_facets'),
     path('properties/create/', views.PropertyCreateView.as_view(), name='property_create'),
     path('properties/my/', views.MyPropertiesView.as_view(), name='my_properties'),
     path('properties/<int:pk>/', views.PropertyDetailView.as_view(), name='property_detail'),
     path('properties/<int:pk>/update/', views.PropertyUpdateView.as_view(), name='property_update'),
     path('properties/<int:pk>/delete/', views.PropertyDeleteView.as_view(), name='property_delete'),
+    path('properties/<int:pk>/similar/', views.similar_properties, name='similar_properties'),
 
     # Property Images URLs
     path('property-images/', views.PropertyImageCreateView.as_view(), name='property_image_create'),
@@ -54,6 +56,12 @@ urlpatterns = [
     path('furnishing-types/', views.FurnishingTypeListView.as_view(), name='furnishing_types'),
     path('amenities/', views.AmenityListView.as_view(), name='amenities'),
 
+    # Location URLs
+    path('locations/autocomplete/', views.location_autocomplete, name='location_autocomplete'),
+
+    # Recommendation URLs
+    path('recommendations/', views.recommendations, name='recommendations'),
+
     # Dashboard URLs
     path('dashboard/owner/', views.owner_dashboard, name='owner_dashboard'),
     path('dashboard/tenant/', views.tenant_dashboard, name='tenant_dashboard'),
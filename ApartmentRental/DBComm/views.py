@@ -1,18 +1,24 @@
 # views.py - Django REST Framework Views (FIXED)
 
-from rest_framework import generics, status, permissions, filters
-from rest_framework.decorators import api_view, permission_classes
+import hashlib
+
+from rest_framework import generics, status, permissions
+from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import login, logout
-from django.db.models import Q, Avg, Count, F
+from django.core.cache import cache
+from django.db import transaction
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import F, Q, Avg, Count, Case, When, Value, IntegerField
+from django.db.models.functions import Greatest, Upper
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import (
     User, Property, PropertyType, FurnishingType, Amenity,
     Listing, PropertyImage, PropertyInquiry, SavedProperty,
-    UserSearch, ReviewRating, PropertyVisit, Address
+    UserSearch, ReviewRating, PropertyVisit, Address, PropertySearchDocument, Locality
 )
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer,
@@ -20,10 +26,23 @@ from .serializers import (
     PropertyTypeSerializer, FurnishingTypeSerializer, AmenitySerializer,
     ListingSerializer, PropertyImageSerializer, PropertyInquirySerializer,
     SavedPropertySerializer, UserSearchSerializer, ReviewRatingSerializer,
-    PropertyVisitSerializer, PropertySearchSerializer, AddressSerializer
+    PropertyVisitSerializer, PropertySearchSerializer, AddressSerializer, LocalitySerializer,
+    BulkListingChangeSerializer, BulkListingItemSerializer, BULK_LISTING_MAX_ITEMS
 )
-from .filters import PropertyFilter
+from .filters import PropertyFilter, FullTextSearchFilter, PropertyOrderingFilter
+from .search import search_documents, search_scopes, schedule_search_document_refresh
 from .permissions import IsOwnerOrReadOnly, IsOwnerOnly
+from .pagination import KeysetPagination, InquiryPagination
+from .facets import compute_facets, facet_cache_key, FACET_CACHE_TIMEOUT
+from .caching import (
+    search_page_cache_key, property_detail_cache_key, get_cached_result, set_cached_result, get_versions,
+    property_scope, user_scope, bump_versions_on_commit, DETAIL_CACHE_TIMEOUT
+)
+from .buffers import search_log, listing_views
+from .recommendations import recommend_properties, RECOMMENDATION_CACHE_TIMEOUT
+from .similar import similar_index
+from .readers import property_list_reader, saved_property_reader
+from .fieldsets import requested_fieldset
 
 
 # Authentication Views
@@ -99,19 +118,31 @@ class PropertyListView(generics.ListAPIView):
     """List all active properties with search and filtering"""
     serializer_class = PropertyListSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, PropertyOrderingFilter]
     filterset_class = PropertyFilter
-    search_fields = ['title', 'description', 'address__locality', 'address__city']
-    ordering_fields = ['created_at', 'title', 'bedrooms', 'total_area_sqft']
+    ordering_fields = [
+        'created_at', 'title', 'bedrooms', 'total_area_sqft', 'monthly_rent', 'price_per_sqft', 'views_count',
+        'average_rating'
+    ]
     ordering = ['-created_at']
 
     def get_queryset(self):
-        return Property.objects.filter(
-            is_active=True,
-            listings__listing_status='active'
-        ).distinct().select_related(
-            'property_type', 'furnishing', 'owner', 'address'
-        ).prefetch_related('images', 'listings')
+        # Filtering, ordering and pagination run on the flat search documents;
+        # only the final page is loaded from the property tables.
+        return PropertySearchDocument.objects.defer('search_vector')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        # The page is rendered by the lean reader, which returns the same payload as
+        # PropertyListSerializer without building model instances
+        reader = property_list_reader(requested_fieldset(request))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.read(doc.pk for doc in page))
+
+        return Response(reader.read(doc.pk for doc in queryset))
 
 
 class PropertyDetailView(generics.RetrieveAPIView):
@@ -119,22 +150,51 @@ class PropertyDetailView(generics.RetrieveAPIView):
     serializer_class = PropertyDetailSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'pk'
+    select_related_fields = ('property_type', 'furnishing', 'owner', 'address')
+    prefetch_related_fields = ('images', 'nearby_places', 'listings')
 
     def get_queryset(self):
+        # Only relations that will be embedded are joined or prefetched
+        # (amenities and reviews are loaded by their method fields)
+        fieldset = requested_fieldset(self.request)
         return Property.objects.select_related(
-            'property_type', 'furnishing', 'owner', 'address'
+            *(name for name in self.select_related_fields if fieldset.expands(name))
         ).prefetch_related(
-            'images', 'amenities', 'nearby_places', 'listings', 'reviews'
+            *(name for name in self.prefetch_related_fields if fieldset.expands(name))
         )
 
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'fieldset': requested_fieldset(self.request)}
+
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        # Increment view count for active listings
-        instance.listings.filter(listing_status='active').update(
-            views_count=F('views_count') + 1
+        property_id = self.kwargs[self.lookup_field]
+        cache_key = property_detail_cache_key(
+            property_id, request.build_absolute_uri('/'), requested_fieldset(request)
         )
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        data = get_cached_result(cache_key)
+        if data is None:
+            # Versions are read before the rows, so a change committed meanwhile still
+            # invalidates the entry; the owner is embedded, so their scope counts too
+            scopes = [property_scope(property_id)]
+            owner_id = Property.objects.filter(pk=property_id).values_list('owner_id', flat=True).first()
+            if owner_id:
+                scopes.append(user_scope(owner_id))
+            versions = get_versions(scopes)
+            data = self.get_serializer(self.get_object()).data
+            set_cached_result(cache_key, versions, data, DETAIL_CACHE_TIMEOUT)
+
+        # Counted in memory and written in batches, so viewing a listing never writes
+        listing_views.record(property_id, self.get_visitor(request))
+        return Response(data)
+
+    def get_visitor(self, request):
+        """Identifies a visitor for view de-duplication: user, else session, else address and agent"""
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        if request.session.session_key:
+            return f'session:{request.session.session_key}'
+        client = f"{request.META.get('REMOTE_ADDR', '')}|{request.META.get('HTTP_USER_AGENT', '')}"
+        return f'client:{hashlib.sha1(client.encode()).hexdigest()}'
 
 
 class PropertyCreateView(generics.CreateAPIView):
@@ -175,9 +235,17 @@ class MyPropertiesView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Property.objects.filter(
-            owner=self.request.user
-        ).select_related('property_type', 'furnishing', 'address')
+        return Property.objects.filter(owner=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).only('pk')
+
+        reader = property_list_reader(requested_fieldset(request))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.read(obj.pk for obj in page))
+
+        return Response(reader.read(obj.pk for obj in queryset))
 
 
 # Property Search
@@ -190,87 +258,50 @@ def search_properties(request):
         return Response(search_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     filters = search_serializer.validated_data
-    queryset = Property.objects.filter(
-        is_active=True,
-        listings__listing_status='active'
-    ).distinct()
-
-    # Apply filters
-    if filters.get('location'):
-        location = filters['location']
-        queryset = queryset.filter(
-            Q(address__locality__icontains=location) |
-            Q(address__city__icontains=location) |
-            Q(address__state__icontains=location)
-        )
-
-    if filters.get('property_type'):
-        queryset = queryset.filter(property_type_id=filters['property_type'])
-
-    if filters.get('furnishing'):
-        queryset = queryset.filter(furnishing_id=filters['furnishing'])
-
-    if filters.get('bedrooms'):
-        queryset = queryset.filter(bedrooms=filters['bedrooms'])
 
-    if filters.get('bathrooms'):
-        queryset = queryset.filter(bathrooms__gte=filters['bathrooms'])
-
-    if filters.get('min_area'):
-        queryset = queryset.filter(total_area_sqft__gte=filters['min_area'])
-
-    if filters.get('max_area'):
-        queryset = queryset.filter(total_area_sqft__lte=filters['max_area'])
-
-    if filters.get('preferred_tenant'):
-        queryset = queryset.filter(
-            Q(preferred_tenant=filters['preferred_tenant']) |
-            Q(preferred_tenant='any')
+    # Pagination parameters come from the query string so the next/previous links
+    # can be re-posted with the same body. Cached pages stay valid until a document
+    # in a city the search can match changes.
+    cache_key = search_page_cache_key(filters, request.build_absolute_uri())
+    page = get_cached_result(cache_key)
+    if page is None:
+        versions = get_versions(search_scopes(filters))
+        paginator = KeysetPagination()
+        documents = paginator.paginate_queryset(
+            search_documents(filters).only('pk', 'created_at').order_by(*paginator.keyset),
+            request
         )
+        page = paginator.get_paginated_response([document.pk for document in documents]).data
+        set_cached_result(cache_key, versions, page)
 
-    if filters.get('parking_required'):
-        queryset = queryset.filter(parking_available=True)
-
-    if filters.get('available_from'):
-        queryset = queryset.filter(available_from__lte=filters['available_from'])
-
-    # Filter by rent range
-    if filters.get('min_rent') or filters.get('max_rent'):
-        listing_filters = {}
-        if filters.get('min_rent'):
-            listing_filters['listings__monthly_rent__gte'] = filters['min_rent']
-        if filters.get('max_rent'):
-            listing_filters['listings__monthly_rent__lte'] = filters['max_rent']
-        queryset = queryset.filter(**listing_filters)
-
-    # Filter by amenities
-    if filters.get('amenities'):
-        for amenity_id in filters['amenities']:
-            queryset = queryset.filter(amenities__id=amenity_id)
-
-    # Save search if user is authenticated
+    # Save search if user is authenticated (written in batches off the request path)
     if request.user.is_authenticated:
-        UserSearch.objects.create(
-            user=request.user,
-            location=filters.get('location', ''),
-            min_rent=filters.get('min_rent'),
-            max_rent=filters.get('max_rent'),
-            bedrooms=filters.get('bedrooms'),
-            property_type_id=filters.get('property_type'),
-            furnishing_id=filters.get('furnishing'),
-            search_query=filters
-        )
+        search_log.record(request.user.pk, filters)
 
-    # Serialize results
-    properties = queryset.select_related(
-        'property_type', 'furnishing', 'owner', 'address'
-    ).prefetch_related('images', 'listings')[:50]  # Limit to 50 results
+    # Only the properties on this page are loaded and serialized
+    reader = property_list_reader(requested_fieldset(request))
+    return Response({**page, 'results': reader.read(page['results'])})
 
-    serializer = PropertyListSerializer(properties, many=True)
-    return Response({
-        'count': len(properties),
-        'results': serializer.data
-    })
+
+# Property Facets
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def property_facets(request):
+    """Result counts per filter option for the current PropertyFilter parameters"""
+    filterset = PropertyFilter(
+        request.query_params,
+        queryset=PropertySearchDocument.objects.all(),
+        request=request
+    )
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    cache_key = facet_cache_key(filterset.form.cleaned_data)
+    data = cache.get(cache_key)
+    if data is None:
+        data = compute_facets(filterset.qs)
+        cache.set(cache_key, data, FACET_CACHE_TIMEOUT)
+    return Response(data)
 
 
 # Listing Views
@@ -278,6 +309,7 @@ class ListingViewSet(ModelViewSet):
     """CRUD operations for property listings"""
     serializer_class = ListingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    bulk_max_items = BULK_LISTING_MAX_ITEMS
 
     def get_queryset(self):
         if self.request.user.user_type in ['owner', 'both']:
@@ -293,6 +325,79 @@ class ListingViewSet(ModelViewSet):
             from rest_framework import serializers as drf_serializers
             raise drf_serializers.ValidationError("Property not found or not owned by user")
 
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """
+        Change status, rent or expiry of many listings in one request: the same changes for
+        every listing ({"ids": [...], "monthly_rent": ...}) or per listing ({"items": [{"id": ...,
+        "listing_status": ...}, ...]}). Returns a result per listing, in request order.
+        """
+        if 'items' in request.data:
+            entries = request.data['items']
+            if not isinstance(entries, list):
+                return Response({'error': 'items must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+            changes_by_id, results = {}, []
+            for entry in entries:
+                item_serializer = BulkListingItemSerializer(data=entry)
+                if not item_serializer.is_valid():
+                    listing_id = entry.get('id') if isinstance(entry, dict) else None
+                    results.append({'id': listing_id, 'status': 'invalid', 'errors': item_serializer.errors})
+                    continue
+                changes = dict(item_serializer.validated_data)
+                listing_id = changes.pop('id')
+                if listing_id in changes_by_id:
+                    results.append({'id': listing_id, 'status': 'invalid', 'errors': ['Listing given more than once']})
+                    continue
+                changes_by_id[listing_id] = changes
+                results.append({'id': listing_id})
+        else:
+            change_serializer = BulkListingChangeSerializer(data=request.data)
+            if not change_serializer.is_valid():
+                return Response(change_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            shared_changes = dict(change_serializer.validated_data)
+            ids = shared_changes.pop('ids')
+            changes_by_id = {listing_id: shared_changes for listing_id in ids}
+            results = [{'id': listing_id} for listing_id in dict.fromkeys(ids)]
+
+        if len(results) > self.bulk_max_items:
+            return Response(
+                {'error': f'At most {self.bulk_max_items} listings per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fields = sorted({name for changes in changes_by_id.values() for name in changes})
+        now = timezone.now()
+        with transaction.atomic():
+            # Ownership of every listing is checked by this one query (get_queryset is owner-scoped)
+            listings = {
+                listing.pk: listing
+                for listing in self.get_queryset().filter(pk__in=changes_by_id).select_for_update(
+                    of=('self',)
+                ).only('pk', 'property_id', *fields)
+            }
+            if 'items' in request.data:
+                for listing_id, listing in listings.items():
+                    for name, value in changes_by_id[listing_id].items():
+                        setattr(listing, name, value)
+                    listing.updated_at = now
+                Listing.objects.bulk_update(listings.values(), [*fields, 'updated_at'], batch_size=500)
+            elif listings:
+                Listing.objects.filter(pk__in=listings).update(**shared_changes, updated_at=now)
+
+            # update() and bulk_update() send no signals
+            property_ids = {listing.property_id for listing in listings.values()}
+            schedule_search_document_refresh(property_ids)
+            bump_versions_on_commit(property_scope(property_id) for property_id in property_ids)
+
+        for result in results:
+            if 'status' in result:
+                continue
+            if result['id'] in listings:
+                result['status'] = 'updated'
+            else:
+                result.update(status='not_found', errors=['Listing not found'])
+        return Response({'updated': len(listings), 'results': results})
+
 
 # Property Inquiry Views
 class PropertyInquiryCreateView(generics.CreateAPIView):
@@ -300,44 +405,40 @@ class PropertyInquiryCreateView(generics.CreateAPIView):
     serializer_class = PropertyInquirySerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        property_id = self.request.data.get('property')
-        listing_id = self.request.data.get('listing')
-
-        # Increment contact count for the listing
-        try:
-            listing = Listing.objects.get(id=listing_id)
-            listing.contact_count += 1
-            listing.save()
-        except Listing.DoesNotExist:
-            pass
-
-        serializer.save(
+        inquiry = serializer.save(
             inquirer=self.request.user,
             inquiry_date=timezone.now()
         )
 
+        # Increment contact count for the listing in the same transaction as the inquiry;
+        # a single-column UPDATE, so concurrent inquiries are all counted and updated_at is untouched
+        Listing.objects.filter(pk=inquiry.listing_id).update(contact_count=F('contact_count') + 1)
+
 
 class MyInquiriesView(generics.ListAPIView):
     """List user's inquiries"""
     serializer_class = PropertyInquirySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = InquiryPagination
 
     def get_queryset(self):
         return PropertyInquiry.objects.filter(
             inquirer=self.request.user
-        ).select_related('property', 'listing').order_by('-inquiry_date')
+        ).select_related('property', 'listing').order_by('-inquiry_date', '-id')
 
 
 class ReceivedInquiriesView(generics.ListAPIView):
     """List inquiries received for user's properties"""
     serializer_class = PropertyInquirySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = InquiryPagination
 
     def get_queryset(self):
         return PropertyInquiry.objects.filter(
             property__owner=self.request.user
-        ).select_related('property', 'listing', 'inquirer').order_by('-inquiry_date')
+        ).select_related('property', 'listing', 'inquirer').order_by('-inquiry_date', '-id')
 
 
 @api_view(['PATCH'])
@@ -367,9 +468,16 @@ class SavedPropertiesView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return SavedProperty.objects.filter(
-            user=self.request.user
-        ).select_related('property')
+        return SavedProperty.objects.filter(user=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).only('pk')
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(saved_property_reader().read(obj.pk for obj in page))
+
+        return Response(saved_property_reader().read(obj.pk for obj in queryset))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -404,12 +512,13 @@ class PropertyReviewsView(generics.ListAPIView):
     """List reviews for a property"""
     serializer_class = ReviewRatingSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         property_id = self.kwargs['property_id']
         return ReviewRating.objects.filter(
             property_id=property_id
-        ).select_related('reviewer').order_by('-created_at')
+        ).select_related('reviewer').order_by('-created_at', '-id')
 
 
 # Property Visits
@@ -486,6 +595,85 @@ def delete_property_image(request, image_id):
         return Response({'error': 'Image not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+# Location Autocomplete
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def location_autocomplete(request):
+    """Suggest localities and cities - prefix matches first, then fuzzy trigram matches"""
+    query = request.query_params.get('q', '').strip()
+    if len(query) < 2:
+        return Response({'results': []})
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 25)
+    except ValueError:
+        limit = 10
+
+    # Compare against UPPER() so every condition can use the trigram expression indexes
+    is_prefix = Q(locality_name__istartswith=query) | Q(city__istartswith=query)
+    localities = Locality.objects.annotate(
+        name_upper=Upper('locality_name'),
+        city_upper=Upper('city')
+    ).filter(
+        is_prefix |
+        Q(name_upper__trigram_similar=query.upper()) |
+        Q(city_upper__trigram_similar=query.upper())
+    ).annotate(
+        prefix_match=Case(When(is_prefix, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        similarity=Greatest(
+            TrigramSimilarity('locality_name', query),
+            TrigramSimilarity('city', query)
+        )
+    ).order_by('-prefix_match', '-similarity', 'locality_name')[:limit]
+
+    return Response({'results': LocalitySerializer(localities, many=True).data})
+
+
+# Recommendations
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def recommendations(request):
+    """Active properties ranked for the current user from their preferences and recent searches"""
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+    except ValueError:
+        limit = 20
+
+    cache_key = f'recommendations:{request.user.pk}:{limit}'
+    ranked = cache.get(cache_key)
+    if ranked is None:
+        ranked = recommend_properties(request.user, limit)
+        cache.set(cache_key, ranked, RECOMMENDATION_CACHE_TIMEOUT)
+
+    scores = dict(ranked)
+    results = property_list_reader(requested_fieldset(request)).read(scores)
+    for item in results:
+        item['score'] = scores[item['id']]
+    return Response({'results': results})
+
+
+# Similar Properties
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def similar_properties(request, pk):
+    """Nearest listings in the same city by rent, size, location, type and amenities"""
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 30)
+    except ValueError:
+        limit = 10
+
+    neighbours = similar_index.similar(pk, limit)
+    if neighbours is None:
+        # Not searchable (inactive, no active listing or not indexed yet)
+        if not Property.objects.filter(pk=pk).exists():
+            return Response({'error': 'Property not found'}, status=status.HTTP_404_NOT_FOUND)
+        neighbours = []
+
+    reader = property_list_reader(requested_fieldset(request))
+    results = reader.read(property_id for property_id, _ in neighbours)
+    return Response({'results': results})
+
+
 # Dashboard/Analytics Views
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])